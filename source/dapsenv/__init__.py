@@ -22,7 +22,8 @@ import sys
 from dapsenv.argparser import ArgParser
 from dapsenv.exceptions import InvalidCommandLineException, InvalidActionException
 from dapsenv.general import (HOME_DIR, LOG_DIR, TMP_DIR, BUILDS_DIR, TEMPLATE_PATH,
-                             DAEMON_AUTH_PATH, CLIENT_TOKEN_PATH, TOKEN_LENGTH)
+                             DAEMON_AUTH_PATH, CLIENT_TOKEN_PATH, TOKEN_LENGTH, WORKTREES_DIR,
+                             SNAPSHOTS_DIR, RUNNING_LOG_DIR)
 from dapsenv.logmanager import set_log_level
 from dapsenv.utils import randomString, createdir
 from importlib import import_module
@@ -65,7 +66,7 @@ def create_files():
     """Creates all necessary files and directories
     """
 
-    for d in (HOME_DIR, LOG_DIR, TMP_DIR, BUILDS_DIR):
+    for d in (HOME_DIR, LOG_DIR, RUNNING_LOG_DIR, TMP_DIR, BUILDS_DIR, WORKTREES_DIR, SNAPSHOTS_DIR):
         createdir(d)
 
     # files
@@ -105,7 +106,9 @@ def execute(args):
         "token-deauthorize": "tokendeauthorize",
         "td": "tokendeauthorize",
         "view-log": "viewlog",
-        "vl": "viewlog"
+        "vl": "viewlog",
+        "follow-log": "followlog",
+        "fl": "followlog"
     }
 
     try:
@@ -116,7 +119,7 @@ def execute(args):
 
     try:
         class_name = result.title()
-        module = import_module("dapsenv.actions.{}".format(action))
+        module = import_module("dapsenv.actions.{}".format(result))
 
         # initialize class
         instance = getattr(module, class_name)()
@@ -18,31 +18,53 @@
 
 import copy
 import dapsenv.configmanager as configmanager
-import dapsenv.xslt as xslt
+import functools
 import grp
+import gzip
+import io
 import json
 import os
 import pwd
+import shutil
 import sys
+import tarfile
 import threading
 import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dapsenv.actions.action import Action
 from dapsenv.apiserver import APIServer
 from dapsenv.autobuildconfig import AutoBuildConfig
+from dapsenv.buildcache import BuildCache
+from dapsenv.changeindex import ChangeIndex
+from dapsenv.containerpool import ContainerPool
 from dapsenv.daemonauth import DaemonAuth
-from dapsenv.docker import Container
-from dapsenv.dockerregistry import is_image_imported
+from dapsenv.dependencycache import DependencyCache
+from dapsenv.docker import Container, APIContainer, CONTAINER_SCRIPTS
+from dapsenv.dockerapi import DockerClient
+from dapsenv.dockerregistry import is_image_imported, get_image_id
 from dapsenv.exceptions import (AutoBuildConfigurationErrorException,
                                 UserNotInDockerGroupException, GitInvalidRepoException,
                                 DockerImageMissingException, InvalidRootIDException,
-                                GitErrorException)
+                                GitErrorException, GitTimeoutException, GitInvalidBranchName,
+                                DockerRegisteryException, DockerAPIException)
 from dapsenv.exitcodes import E_INVALID_GIT_REPO, E_DOCKER_IMAGE_MISSING
 from dapsenv.general import (DAEMON_DEFAULT_INTERVAL, BUILDS_DIR, DAEMON_DEFAULT_MAX_CONTAINERS,
-                             API_SERVER_DEFAULT_PORT, LOG_DIR, CONTAINER_IMAGE, DAEMON_AUTH_PATH)
+                             API_SERVER_DEFAULT_PORT, LOG_DIR, CONTAINER_IMAGE, DAEMON_AUTH_PATH,
+                             DAEMON_DEFAULT_POLL_WORKERS, DAEMON_DEFAULT_POLL_TIMEOUT,
+                             DEPENDENCY_CACHE_PATH, DAEMON_DEFAULT_CONTAINER_POOL_MIN,
+                             DAEMON_DEFAULT_CONTAINER_POOL_MAX,
+                             DAEMON_DEFAULT_CONTAINER_MAX_BUILDS, SNAPSHOTS_DIR, BUILD_FORMATS,
+                             DAEMON_DEFAULT_FORMAT_PRIORITY, BUILD_CACHE_PATH,
+                             DAEMON_DEFAULT_LOG_MAX_AGE, DAEMON_DEFAULT_LOG_MAX_SIZE,
+                             LOG_STREAM_CHUNK_SIZE, SOURCE_DIR, __version__)
 from dapsenv.ircbot import IRCBot
-from dapsenv.logserver import LogServer
-from http.server import HTTPServer
+from dapsenv.joblog import get_running_log_path, finish_job_log, remove_job_logs
+from dapsenv.jobregistry import JobRegistry
+from dapsenv.logretention import prune_logs
+from dapsenv.logserver import LogServer, ThreadingHTTPServer
+from dapsenv.snapshotstore import SnapshotStore
+from lxml import etree
 from socket import gethostname
 
 import logging
@@ -94,20 +116,37 @@ class Daemon(Action):
         self._logserver_httpd = None
         self._hostname = gethostname()
         self._auth = DaemonAuth(DAEMON_AUTH_PATH)
+        self._dependency_cache = DependencyCache(DEPENDENCY_CACHE_PATH)
+        self._snapshots = SnapshotStore(SNAPSHOTS_DIR)
+        self._build_cache = BuildCache(BUILD_CACHE_PATH, BUILDS_DIR, BuildCache.getEnvironmentHash(
+            ["{}/data/{}".format(SOURCE_DIR, name) for name in CONTAINER_SCRIPTS], __version__
+        ))
+        self._image_id = None
+        self._docker = None
 
-        self._daemon_info = {
-            "jobs": [],
-            "scheduled_builds": 0,
-            "running_builds": 0
-        }
+        self._jobs = JobRegistry()
+
+        # the logs of the jobs of an earlier daemon run belong to other job ids
+        remove_job_logs()
 
         # create locks for thread-safe communications
         self._irclock = threading.Lock()
         self._daemon_info_lock = threading.Lock()
 
+        # signals the job manager that a job got scheduled or a build slot got free
+        self._jobs_changed = threading.Condition(self._daemon_info_lock)
+
         # load daemon settings
         self.loadDaemonSettings()
 
+        # the threads which update the repositories live as long as the daemon, so that the
+        # stylesheets they have compiled are reused by the following checks
+        self._poll_executor = ThreadPoolExecutor(max_workers=self._poll_workers)
+
+        # talk to the Docker Engine API directly if wanted
+        if self._docker_backend == "api":
+            self._docker = DockerClient()
+
         # load irc bot config
         self.loadIRCBotConfig()
 
@@ -122,10 +161,17 @@ class Daemon(Action):
         # fetch all projects
         try:
             self.projects = self.autoBuildConfig.fetchProjects()
-        except GitInvalidRepoException as e:
+        except (GitInvalidRepoException, GitInvalidBranchName) as e:
             log.error("Configuration error in auto build config %r! %s",
                       self._autoBuildConfigFile, e.message)
             sys.exit(E_INVALID_GIT_REPO)
+        except GitErrorException as e:
+            log.error("Configuration error in auto build config %r! %s",
+                      self._autoBuildConfigFile, e.stderr)
+            sys.exit(E_INVALID_GIT_REPO)
+
+        # maps the source files of each project to its DC files
+        self._change_indexes = dict((i, ChangeIndex()) for i in self.projects)
 
     def _checkDockerImage(self):
         """Checks if the Docker Image is missing
@@ -159,7 +205,7 @@ class Daemon(Action):
         """Starts the HTTP log server
         """
 
-        self._logserver_httpd = HTTPServer(
+        self._logserver_httpd = ThreadingHTTPServer(
             (self._logserver_ip, int(self._logserver_port)), LogServer
         )
         self._logserver_httpd.serve_forever()
@@ -173,56 +219,71 @@ class Daemon(Action):
         else:
             self._print("The daemon is now running in the debug mode.")
 
+        # warm up the build containers - no containers are started in development mode
+        if self._docker:
+            factory = functools.partial(APIContainer, self._docker,
+                                        snapshots=self._build_snapshots)
+        else:
+            factory = functools.partial(Container, snapshots=self._build_snapshots)
+
+        self._containers = ContainerPool(
+            self._container_pool_min, self._container_pool_max, self._container_max_builds,
+            factory=factory
+        )
+
+        if not self._args["development"]:
+            self._containers.start()
+
         # start thread which is required to handle incoming jobs
         thread = threading.Thread(target=self._jobManager)
         thread.start()
 
-        # run check
-        self.check()
-
-        while True:
-            time.sleep(self._interval)
+        try:
+            # run check
             self.check()
 
-    def _jobManager(self):
-        while True:
-            # get a list of all available jobs
-            self._daemon_info_lock.acquire()
-            running_builds = copy.copy(self._daemon_info["running_builds"])
-            jobs = copy.copy(self._daemon_info["jobs"])
-            self._daemon_info_lock.release()
+            while True:
+                time.sleep(self._interval)
+                self.check()
+        finally:
+            self._containers.shutdown()
+            self._poll_executor.shutdown(wait=False)
+            self._closeRepositories()
+
+    def _closeRepositories(self):
+        """Stops the git processes of all project repositories
+        """
 
-            # search for new jobs in queue
-            if running_builds < self._max_containers:
-                for idx, job in enumerate(jobs):
-                    if running_builds >= self._max_containers:
-                        break
+        for i in self.projects:
+            self.projects[i]["repo"].close()
 
-                    if job["status"] == 0:
-                        # create thread
-                        thread = threading.Thread(
-                            target=self._process,
-                            args=(copy.copy(job["project"]), job["dc_file"][:])
-                        )
+    def _jobManager(self):
+        """Starts scheduled jobs as soon as a build slot is free
 
-                        # start thread
-                        thread.start()
+        The job manager sleeps until it gets notified via 'self._jobs_changed' - either
+        because a new job was scheduled or because a running build has finished.
+        """
 
-                        # update amount of running builds
-                        self._daemon_info_lock.acquire()
+        while True:
+            self._jobs_changed.acquire()
 
-                        running_builds += 1
+            # wait until there is a free build slot and at least one job in the queue
+            while self._jobs.runningCount >= self._max_containers or \
+                    not self._jobs.pendingCount:
+                self._jobs_changed.wait()
 
-                        self._daemon_info["jobs"][idx]["status"] = 1
-                        self._daemon_info["jobs"][idx]["time_started"] = int(time.time())
-                        self._daemon_info["running_builds"] += 1
-                        self._daemon_info["scheduled_builds"] -= 1
+            while self._jobs.runningCount < self._max_containers and self._jobs.pendingCount:
+                job = self._jobs.start(self._jobs.nextPending()["id"])
 
-                        self._daemon_info_lock.release()
-                    else:
-                        break
+                # create and start thread
+                thread = threading.Thread(
+                    target=self._process,
+                    args=(job["id"], copy.copy(job["project"]), job["dc_file"][:],
+                          job["commit"][:], job["formats"][:])
+                )
+                thread.start()
 
-            time.sleep(1)
+            self._jobs_changed.release()
 
     def check(self):
         """Starts docker containers if a documentation got updated
@@ -230,6 +291,20 @@ class Daemon(Action):
 
         self._print("\nChecking for updates in documentation repositories...")
 
+        # the build cache only knows builds of the current image
+        if self._use_build_cache:
+            try:
+                self._image_id = get_image_id(CONTAINER_IMAGE, self._docker)
+            except (DockerRegisteryException, DockerAPIException) as e:
+                log.error("Could not determine the id of the image %r: %s", CONTAINER_IMAGE, e)
+                self._image_id = None
+
+            # forget builds of other images and build environments
+            self._build_cache.prune(self._image_id)
+
+        # keep the disk usage of the log files bounded
+        prune_logs(LOG_DIR, self._log_max_age * 24 * 60 * 60, self._log_max_size * 1024 * 1024)
+
         # check and refresh all repositories
         self._prepare_build_task()
 
@@ -237,74 +312,192 @@ class Daemon(Action):
 
     def _prepare_build_task(self):
         """Goes through all specified repositories and updates those
+
+        The repositories are updated in parallel. Projects which share the same checkout are
+        updated one after another to avoid concurrent git operations on the same repository.
         """
 
+        checkouts = OrderedDict()
         for i in self.projects:
-            # pull new commits into repository
-            self.projects[i]["repo"].pull(self.projects[i]["vcs_branch"], force=True)
+            checkouts.setdefault(self.projects[i]["vcs_repodir"], []).append(i)
 
-            # fetch current commit hash from branch
-            commit = self.projects[i]["repo"].getLastCommitHash(self.projects[i]["vcs_branch"])
+        for future in [self._poll_executor.submit(self._update_checkout, projects)
+                       for projects in checkouts.values()]:
+            future.result()
 
-            # check if the last commit hash got changed
-            if self.projects[i]["vcs_lastrev"] != commit:
-                old_commit = self.projects[i]["vcs_lastrev"]
+        self._dependency_cache.save()
 
-                # update to the new commit hash
-                self.projects[i]["vcs_lastrev"] = commit[:]
-                self.autoBuildConfig.updateCommitHash(self.projects[i]["project"], commit[:])
+        # remove snapshots of old commits
+        if self._build_snapshots:
+            self._snapshots.prune(self.projects[i]["vcs_lastrev"] for i in self.projects)
 
-                # get changed files
-                changed_files = []
+    def _update_checkout(self, projects):
+        """Updates all projects of a checkout one after another
 
-                try:
-                    changed_files = self.projects[i]["repo"].getChangedFilesBetweenCommits(
-                        old_commit, commit
-                    )
-                except GitErrorException:
-                    pass
-
-                # determine assigned DC file for each changed file
-                for dc_file, dc_object in self.projects[i]["dc_files"].items():
-                    build = False
-
-                    if dc_object.rootid:
-                        try:
-                            assigned_files = xslt.getAllUsedFiles(
-                                "{}/xml/{}".format(self.projects[i]["vcs_repodir"], dc_object.main),
-                                dc_object.rootid
-                            )
-
-                            # is at least one element from "changed_files" in "assigned_files"
-                            res = any(i in assigned_files for i in changed_files)
-
-                            if res:
-                                build = True
-                        except InvalidRootIDException:
-                            log.error("Invalid root id in main file '{}' of DC File '{}' specified. Repository: {}".format(
-                                dc_object.main, dc_file, self.projects[i]["vcs_repodir"]
-                            ))
-                    else:
-                        build = True
-
-                    if build:
-                        self._daemon_info_lock.acquire()
-                        self._daemon_info["jobs"].append({"project": copy.copy(self.projects[i]),
-                                                          "dc_file": dc_file[:],
-                                                          "commit": commit[:],
-                                                          "status": 0,
-                                                          "container_id": "",
-                                                          "time_started": 0
-                                                          })
-
-                        self._daemon_info["scheduled_builds"] += 1
-                        self._daemon_info_lock.release()
-
-    def _process(self, project_info, dc_file):
+        :param list projects: The indexes of the projects in 'self.projects'
+        """
+
+        # a failing project must not abort the check of the other projects
+        for i in projects:
+            try:
+                self._update_project(i)
+            except GitTimeoutException as e:
+                log.error("Could not update project '%s': %s", self.projects[i]["project"], e)
+            except GitErrorException as e:
+                log.error("Could not update project '%s': %s", self.projects[i]["project"],
+                          e.stderr)
+            except GitInvalidBranchName as e:
+                log.error("Could not update project '%s': %s", self.projects[i]["project"],
+                          e.message)
+            except Exception:
+                log.exception("Could not update project '%s'", self.projects[i]["project"])
+
+    def _update_project(self, i):
+        """Updates the repository of a project and schedules builds for changed DC files
+
+        :param int i: The index of the project in 'self.projects'
+        """
+
+        # all git commands of the update share one deadline
+        deadline = time.time() + self._poll_timeout
+
+        # fetch new commits (if there are any) and get the current commit hash of the branch
+        commit = self.projects[i]["repo"].update(self.projects[i]["vcs_branch"], deadline)
+
+        # check if the last commit hash got changed
+        if self.projects[i]["vcs_lastrev"] != commit:
+            old_commit = self.projects[i]["vcs_lastrev"]
+
+            # get changed files
+            changed_files = []
+
+            try:
+                changed_files = self.projects[i]["repo"].getChangedFilesBetweenCommits(
+                    old_commit, commit
+                )
+            except GitErrorException:
+                pass
+
+            # move the worktree of the project to the new commit
+            self.projects[i]["repo"].updateWorktree(self.projects[i]["vcs_branch"], commit,
+                                                    deadline)
+
+            # update to the new commit hash
+            self.projects[i]["vcs_lastrev"] = commit[:]
+            self.autoBuildConfig.updateCommitHash(self.projects[i]["project"], commit[:])
+
+            index = self._change_indexes[i]
+
+            # DC files whose sources have changed - their include graph might have changed
+            # as well, so they get indexed again
+            affected = index.getAffectedDCFiles(changed_files)
+
+            # include graphs of this commit, shared by all DC files with the same MAIN file
+            graphs = {}
+
+            for dc_file, dc_object in self.projects[i]["dc_files"].items():
+                if dc_object.rootid and (dc_file in affected or dc_file not in index):
+                    # DC files which can't be indexed get built, so that DAPS reports the error
+                    if not self._index_dc_file(i, dc_file, graphs):
+                        affected.add(dc_file)
+
+            affected.update(index.getAffectedDCFiles(changed_files))
+
+            for dc_file, dc_object in self.projects[i]["dc_files"].items():
+                # DC files without a root id are built on every change
+                if dc_file in affected or not dc_object.rootid:
+                    with self._daemon_info_lock:
+                        self._scheduleBuild(self.projects[i], dc_file[:], commit[:])
+                        self._jobs_changed.notify()
+
+    def _index_dc_file(self, i, dc_file, graphs):
+        """Updates the change index of a project for a DC file
+
+        :param int i: The index of the project in 'self.projects'
+        :param string dc_file: The name of the DC file
+        :param dict graphs: Include graphs of the current commit keyed on their MAIN file
+        :return bool: False if the DC file could not be indexed
+        """
+
+        dc_object = self.projects[i]["dc_files"][dc_file]
+        repo_dir = self.projects[i]["vcs_worktree"]
+
+        try:
+            dependencies = self._dependency_cache.getDependencies(
+                repo_dir,
+                self.projects[i]["vcs_branch"],
+                "{}/xml/{}".format(repo_dir, dc_object.main),
+                dc_object.rootid,
+                graphs
+            )
+        except InvalidRootIDException:
+            log.error("Invalid root id in main file '{}' of DC File '{}' specified. Repository: {}".format(
+                dc_object.main, dc_file, repo_dir
+            ))
+
+            self._change_indexes[i].remove(dc_file)
+            return False
+        except (etree.Error, IOError) as e:
+            log.error("Could not read the main file '%s' of DC File '%s'. Repository: %s - %s",
+                      dc_object.main, dc_file, repo_dir, e)
+
+            self._change_indexes[i].remove(dc_file)
+            return False
+
+        # paths from the include graph are relative to the xml/ directory
+        files = set("xml/{}".format(path) for path in
+                    dependencies["used_files"].union(dependencies["dependencies"]) -
+                    dependencies["images"])
+        files.add(dc_file)
+
+        self._change_indexes[i].update(dc_file, files, dependencies["images"])
+
+        return True
+
+    def _scheduleBuild(self, project, dc_file, commit):
+        """Adds the build jobs of a DC file to the job registry - the caller has to hold the
+        daemon info lock
+
+        Either one job builds all formats of the DC file, or every format gets its own job
+        (if parallel format builds are enabled). Formats are built by their priority.
+
+        :param dict project: The project the DC file belongs to
+        :param string dc_file: The name of the DC file
+        :param string commit: The commit what should get built
+        """
+
+        formats = sorted(project["formats"].get(dc_file, BUILD_FORMATS),
+                         key=self._getFormatPriority)
+
+        if not formats:
+            return
+
+        if self._parallel_formats:
+            for build_format in formats:
+                self._jobs.add(copy.copy(project), dc_file, commit, [build_format],
+                               self._getFormatPriority(build_format))
+        else:
+            self._jobs.add(copy.copy(project), dc_file, commit, formats,
+                           self._getFormatPriority(formats[0]))
+
+    def _getFormatPriority(self, build_format):
+        """Returns the priority of a format - formats which are not listed in
+        'daemon_format_priority' are built last
+
+        :param string build_format: The format
+        :return int: The priority (lower values are built first)
+        """
+
+        return self._format_priority.get(build_format, len(self._format_priority))
+
+    def _process(self, job_id, project_info, dc_file, commit, formats):
         """Thread function to start containers and build documentations
 
+        :param int job_id: The id of the job in the job registry
         :param dict project_info: A dictionary with information about that project
         :param string dc_file: DC what should get built
+        :param string commit: The commit what should get built
+        :param list formats: The formats what should get built
         """
 
         # forbid building of documentations in development mode
@@ -312,143 +505,325 @@ class Daemon(Action):
             while True:
                 time.sleep(30)
 
-        # create container
-        container = Container()
-        container.spawn()
+        container = None
+        reuse = False
+        snapshot = None
 
-        # save container id in daemon info
-        self._daemon_info_lock.acquire()
+        try:
+            # reuse the archives of earlier builds with the same inputs
+            input_hash = self._getInputHash(project_info, dc_file, commit)
+            formats = [f for f in formats
+                       if not self._restoreCachedBuild(job_id, project_info, dc_file, f,
+                                                       input_hash)]
+
+            if not formats:
+                return
+
+            # take a container from the pool
+            container = self._containers.lease()
+
+            # save container id in daemon info
+            with self._daemon_info_lock:
+                self._jobs.setContainerID(job_id, container.getContainerID())
+
+            # prepare container
+            if self._build_snapshots:
+                snapshot = self._snapshots.acquire(project_info["vcs_worktree"], commit)
+                container.prepareSnapshot(snapshot)
+            else:
+                container.prepare(project_info["vcs_worktree"], commit)
+
+            self._build(job_id, container, project_info, dc_file, formats,
+                        get_running_log_path(job_id), input_hash)
+            reuse = True
+        finally:
+            try:
+                if snapshot:
+                    self._snapshots.release(commit)
+
+                # the log gets compressed, but stays available for clients which follow it
+                finish_job_log(job_id)
+
+                # give the container back to the pool - keep it untouched in debug mode
+                if container and self._debug:
+                    self._containers.discard(container)
+                elif container:
+                    self._containers.release(container, reuse)
+            finally:
+                # update amount of running builds - the build slot is freed in any case
+                with self._daemon_info_lock:
+                    self._jobs.finish(job_id)
+                    self._jobs_changed.notify()
+
+    def _getInputHash(self, project_info, dc_file, commit):
+        """Returns a hash over all files a DC file is built from
+
+        The hash covers the git object hashes of the indexed files of the DC file and of the
+        images directory. DC files without a root id depend on the whole repository.
 
-        for idx, job in enumerate(self._daemon_info["jobs"]):
-            if job["dc_file"] == dc_file and job["status"] == 1:
-                job["container_id"] = container.getContainerID()
+        :param dict project_info: A dictionary with information about that project
+        :param string dc_file: The name of the DC file
+        :param string commit: The commit what should get built
+        :return string|None: The hash or None if the build cache can't be used
+        """
+
+        if not self._use_build_cache or not self._image_id:
+            return None
+
+        index = None
+        for i in self.projects:
+            if self.projects[i]["project"] == project_info["project"]:
+                index = self._change_indexes[i]
                 break
 
-        self._daemon_info_lock.release()
+        files = index.getFiles(dc_file) if index else None
 
-        # prepare container
-        container.prepare(project_info["vcs_repodir"])
+        if files is None:
+            paths = [""]
+        else:
+            paths = set("images" if index.isImageKey(path) else path for path in files)
 
-        # specify build formats
-        build_formats = ["html", "single_html", "pdf"]
+        try:
+            object_ids = project_info["repo"].getObjectIDs(commit, paths)
+        except GitErrorException as e:
+            log.error("Could not hash the input files of %r: %s", dc_file, e.stderr)
+            return None
 
-        for f in build_formats:
-            # building the documentation
-            # pdb.set_trace()
-            result = container.buildDocumentation(dc_file, f)
+        return BuildCache.getInputHash(object_ids)
 
-            archive = result["archive_name"]
-            del result["archive_name"]
+    def _restoreCachedBuild(self, job_id, project_info, dc_file, build_format, input_hash):
+        """Links the archive of an earlier build with the same inputs as a new build
 
-            # parse the documentation info
-            product = json.loads(container.execute("cat /tmp/doc_info.json")["stdout"])
+        :param int job_id: The id of the job in the job registry
+        :param dict project_info: A dictionary with information about that project
+        :param string dc_file: The name of the DC file
+        :param string build_format: The format
+        :param string input_hash: @see _getInputHash()
+        :return bool: True if the build can be skipped
+        """
 
-            # add new information to result dict
-            result.update(product)
+        if input_hash is None:
+            return False
 
-            # if debug mode is enabled, add some additional information to the
-            # build_info.json file
-            if self._debug:
-                result["container_id"] = container.getContainerID()
-            else:
-                # remove the daps command from the result dictionary, if debug mode
-                # is disabled
-                del result["dapscmd"]
+        cached_file_name = self._build_cache.get(dc_file, build_format, self._image_id,
+                                                 input_hash)
+        if cached_file_name is None:
+            return False
 
-            if result["build_status"]:
-                # generate a build info file for the documentation archive
-                container.fileCreate("/tmp/build_info.json", json.dumps(result))
+        file_name = self._getArchiveName(dc_file, build_format)
 
-                # add build info file to documentation archive
-                container.execute("tar -C /tmp --append --file={} build_info.json".format(archive))
+        try:
+            os.link("{}/{}".format(BUILDS_DIR, cached_file_name),
+                    "{}/{}".format(BUILDS_DIR, file_name))
+        except FileExistsError:
+            pass
+        except OSError as e:
+            log.error("Could not reuse the archive %r: %s", cached_file_name, e)
+            return False
 
-                # compress tar archive
-                container.execute("gzip {}".format(archive))
+        self._print("Inputs of {} ({}) did not change - reused {}".format(
+            dc_file, build_format, cached_file_name
+        ))
 
-                # copy compiled documentation into the builds/ directory of the user
-                file_name = "{}_{}_{}.tar.gz".format(int(time.time()), dc_file[3:], f.replace("_", "-"))
-                container.fetch("{}.gz".format(archive), "{}/{}".format(
-                    BUILDS_DIR, file_name
-                ))
+        self._announceBuild(job_id, project_info, dc_file, build_format, file_name)
 
-                self._irclock.acquire()
+        return True
 
-                if self._ircbot and self._irc_config["irc_inform_build_success"]:
-                    message = "A new build has been finished on {}! DC-File: {}, Format: {}," \
-                        " Output-Archive: {}".format(
-                            self._hostname,
-                            result["dc_file"],
-                            result["format"],
-                            file_name
-                        )
+    def _getArchiveName(self, dc_file, build_format):
+        """Returns the file name of a new build archive in the builds directory
 
-                    for client in project_info["notifications"]["irc"]:
-                        self._ircbot.sendClientMessage(client, message)
+        :param string dc_file: The name of the DC file
+        :param string build_format: The format
+        :return string: The file name
+        """
 
-                    if self._irc_config["irc_channel_messages"]:
-                        self._ircbot.sendChannelMessage(message)
+        return "{}_{}_{}.tar.gz".format(int(time.time()), dc_file[3:],
+                                        build_format.replace("_", "-"))
 
-                self._irclock.release()
-            else:
-                error_log_name = "build_fail_{}_{}_{}".format(
-                    result["dc_file"],
-                    result["format"],
-                    int(time.time())
-                )
+    def _writeCompressedLog(self, build_log, path):
+        """Writes a gzip compressed copy of a build log
 
-                error_log_path = "{}/{}.log".format(
-                    LOG_DIR,
+        :param string build_log: The path to the build log
+        :param string path: The path of the compressed log
+        """
+
+        tmp_path = "{}.tmp".format(path)
+
+        with open(build_log, "rb") as source:
+            with gzip.open(tmp_path, "wb") as target:
+                shutil.copyfileobj(source, target, LOG_STREAM_CHUNK_SIZE)
+
+        os.replace(tmp_path, path)
+
+    def _writeBuildArchive(self, archive, build_log, build_info, path):
+        """Writes the compressed documentation archive of a build
+
+        The archive contains the built documentation, the build log and a 'build_info.json'
+        file. It is written to a temporary file first, so that nobody sees an incomplete
+        archive.
+
+        :param string archive: The path to the uncompressed documentation archive
+        :param string build_log: The path to the build log
+        :param dict build_info: The content of the build info file
+        :param string path: The path of the compressed archive
+        """
+
+        data = json.dumps(build_info).encode("utf-8")
+        info = tarfile.TarInfo("build_info.json")
+        info.size = len(data)
+        info.mtime = time.time()
+
+        tmp_path = "{}.tmp".format(path)
+
+        with tarfile.open(tmp_path, "w:gz") as target:
+            with tarfile.open(archive) as source:
+                for member in source:
+                    target.addfile(member, source.extractfile(member) if member.isfile() else None)
+
+            target.add(build_log, arcname="build.log")
+            target.addfile(info, io.BytesIO(data))
+
+        os.replace(tmp_path, path)
+
+    def _build(self, job_id, container, project_info, dc_file, formats, log_path=os.devnull,
+               input_hash=None):
+        """Builds formats of a DC file inside a prepared container
+
+        The formats are built in the given order. The sources get profiled only once, but
+        the result of each format is stored and announced as soon as the format is built.
+
+        :param int job_id: The id of the job in the job registry
+        :param Container container: A prepared container
+        :param dict project_info: A dictionary with information about that project
+        :param string dc_file: DC what should get built
+        :param list formats: The formats what should get built
+        :param string log_path: The output of the build is written to this file while the
+                                build is running
+        :param string input_hash: Adds the builds to the build cache (@see _getInputHash())
+        """
+
+        for result in container.buildDocumentations(dc_file, formats, log_path):
+            # build log and documentation archive were copied to temporary files on the host
+            build_log = result.pop("log_name")
+            archive = result.pop("archive_name")
+
+            try:
+                self._processResult(job_id, project_info, dc_file, container, result,
+                                    build_log, archive, input_hash)
+            finally:
+                for name in (build_log, archive):
+                    if name and os.path.exists(name):
+                        os.remove(name)
+
+        # execute cleanup script
+        container.cleanup()
+
+    def _processResult(self, job_id, project_info, dc_file, container, result, build_log,
+                       archive, input_hash):
+        """Stores the build result of a format and sends the notifications
+
+        :param int job_id: The id of the job in the job registry
+        :param dict project_info: A dictionary with information about that project
+        :param string dc_file: The name of the DC file
+        :param Container container: The container of the build
+        :param dict result: The build result (@see Container.buildDocumentations())
+        :param string build_log: The path to the build log
+        :param string archive: The path to the documentation archive
+        :param string input_hash: Adds the build to the build cache (@see _getInputHash())
+        """
+
+        # if debug mode is enabled, add some additional information to the
+        # build_info.json file
+        if self._debug:
+            result["container_id"] = container.getContainerID()
+        else:
+            # remove the daps command from the result dictionary, if debug mode
+            # is disabled
+            del result["dapscmd"]
+
+        if result["build_status"]:
+            # compress the documentation together with a build info file into the
+            # builds/ directory of the user
+            file_name = self._getArchiveName(dc_file, result["format"])
+
+            self._writeBuildArchive(archive, build_log, result,
+                                    "{}/{}".format(BUILDS_DIR, file_name))
+
+            if input_hash:
+                self._build_cache.add(dc_file, result["format"], self._image_id, input_hash,
+                                      file_name)
+
+            self._announceBuild(job_id, project_info, result["dc_file"], result["format"],
+                                file_name)
+        else:
+            error_log_name = "build_fail_{}_{}_{}".format(
+                result["dc_file"],
+                result["format"],
+                int(time.time())
+            )
+
+            error_log_path = "{}/{}.log.gz".format(
+                LOG_DIR,
+                error_log_name
+            )
+
+            if self._logserver:
+                irc_path = "http://{}:{}/logs/{}".format(
+                    self._logserver_ip,
+                    self._logserver_port,
                     error_log_name
                 )
+            else:
+                irc_path = error_log_path
 
-                if self._logserver:
-                    irc_path = "http://{}:{}/logs/{}".format(
-                        self._logserver_ip,
-                        self._logserver_port,
-                        error_log_name
-                    )
-                else:
-                    irc_path = error_log_path
-
-                with open(error_log_path, "w+") as f:
-                    f.write(result["build_log"])
+            self._writeCompressedLog(build_log, error_log_path)
 
-                self._irclock.acquire()
+            self._irclock.acquire()
 
-                if self._ircbot and self._irc_config["irc_inform_build_fail"]:
-                    message = "A build has failed on {}! DC-File: {}, Format: {}, " \
-                        "Error-Log: {}".format(
-                            self._hostname,
-                            result["dc_file"],
-                            result["format"],
-                            irc_path
-                        )
+            if self._ircbot and self._irc_config["irc_inform_build_fail"]:
+                message = "A build has failed on {}! Job-ID: {}, DC-File: {}, Format: {}, " \
+                    "Error-Log: {}".format(
+                        self._hostname,
+                        job_id,
+                        result["dc_file"],
+                        result["format"],
+                        irc_path
+                    )
 
-                    for client in project_info["notifications"]["irc"]:
-                        self._ircbot.sendClientMessage(client, message)
+                for client in project_info["notifications"]["irc"]:
+                    self._ircbot.sendClientMessage(client, message)
 
-                    if self._irc_config["irc_channel_messages"]:
-                        self._ircbot.sendChannelMessage(message)
+                if self._irc_config["irc_channel_messages"]:
+                    self._ircbot.sendChannelMessage(message)
 
-                self._irclock.release()
+            self._irclock.release()
 
-            # execute cleanup script
-            container.cleanup()
+    def _announceBuild(self, job_id, project_info, dc_file, build_format, file_name):
+        """Informs the IRC clients of a project about a new build archive
 
-        # update amount of running builds
-        self._daemon_info_lock.acquire()
+        :param int job_id: The id of the job in the job registry
+        :param dict project_info: A dictionary with information about that project
+        :param string dc_file: The name of the DC file
+        :param string build_format: The format
+        :param string file_name: The file name of the archive in the builds directory
+        """
 
-        self._daemon_info["running_builds"] -= 1
-        for idx, job in enumerate(self._daemon_info["jobs"]):
-            if job["dc_file"] == dc_file and job["status"] == 1:
-                self._daemon_info["jobs"].pop(idx)
-                break
+        with self._irclock:
+            if self._ircbot and self._irc_config["irc_inform_build_success"]:
+                message = "A new build has been finished on {}! Job-ID: {}, DC-File: {}, " \
+                    "Format: {}, Output-Archive: {}".format(
+                        self._hostname,
+                        job_id,
+                        dc_file,
+                        build_format,
+                        file_name
+                    )
 
-        self._daemon_info_lock.release()
+                for client in project_info["notifications"]["irc"]:
+                    self._ircbot.sendClientMessage(client, message)
 
-        # kill and delete container from the registry
-        if not self._debug:
-            container.kill()
+                if self._irc_config["irc_channel_messages"]:
+                    self._ircbot.sendChannelMessage(message)
 
     def _print(self, message):
         """Prints messages to the CLI
@@ -473,20 +848,12 @@ class Daemon(Action):
                 project = self.projects[idx]
                 if requested_project == project["project"]:
                     for dc_file in project["dc_files"]:
-                        self._daemon_info["jobs"].append({
-                            "project": copy.copy(project),
-                            "dc_file": dc_file,
-                            "commit": project["vcs_lastrev"],
-                            "status": 0,
-                            "container_id": "",
-                            "time_started": 0
-                        })
-
-                        self._daemon_info["scheduled_builds"] += 1
+                        self._scheduleBuild(project, dc_file, project["vcs_lastrev"])
 
                     valid_projects.append(project["project"])
                     break
 
+        self._jobs_changed.notify()
         self._daemon_info_lock.release()
 
         return valid_projects
@@ -505,16 +872,8 @@ class Daemon(Action):
                 project = self.projects[idx]
                 if dc_file in project["dc_files"]:
                     self._daemon_info_lock.acquire()
-                    self._daemon_info["jobs"].append({
-                        "project": copy.copy(self.projects[idx]),
-                        "dc_file": dc_file[:],
-                        "commit": project["vcs_lastrev"],
-                        "status": 0,
-                        "container_id": "",
-                        "time_started": 0
-                    })
-
-                    self._daemon_info["scheduled_builds"] += 1
+                    self._scheduleBuild(project, dc_file[:], project["vcs_lastrev"])
+                    self._jobs_changed.notify()
                     self._daemon_info_lock.release()
 
                     valid_dcs.append(dc_file)
@@ -526,19 +885,34 @@ class Daemon(Action):
         result = []
 
         self._daemon_info_lock.acquire()
-        for job in self._daemon_info["jobs"]:
+        for job in self._jobs.jobs():
             result.append({
+                "id": job["id"],
                 "project": job["project"]["project"],
                 "branch": job["project"]["vcs_branch"],
                 "dc_file": job["dc_file"],
                 "status": job["status"],
                 "commit": job["commit"],
+                "formats": job["formats"],
                 "time_started": job["time_started"],
             })
         self._daemon_info_lock.release()
 
         return result
 
+    def getJobsByDCFile(self, dc_file):
+        """Returns copies of all known jobs of a DC file
+
+        :param string dc_file: The name of the DC file
+        :return list: A list of jobs, ordered by their id
+        """
+
+        self._daemon_info_lock.acquire()
+        jobs = [copy.copy(job) for job in self._jobs.getByDCFile(dc_file)]
+        self._daemon_info_lock.release()
+
+        return jobs
+
     def getProjectNames(self):
         projects = OrderedDict()
 
@@ -580,6 +954,68 @@ class Daemon(Action):
         except TypeError:
             self._max_containers = DAEMON_DEFAULT_MAX_CONTAINERS
 
+        # daemon_container_pool_min
+        try:
+            self._container_pool_min = int(configmanager.get_prop("daemon_container_pool_min"))
+        except TypeError:
+            self._container_pool_min = DAEMON_DEFAULT_CONTAINER_POOL_MIN
+
+        # daemon_container_pool_max
+        try:
+            self._container_pool_max = int(configmanager.get_prop("daemon_container_pool_max"))
+        except TypeError:
+            self._container_pool_max = DAEMON_DEFAULT_CONTAINER_POOL_MAX
+
+        # daemon_container_max_builds
+        try:
+            self._container_max_builds = int(configmanager.get_prop("daemon_container_max_builds"))
+        except TypeError:
+            self._container_max_builds = DAEMON_DEFAULT_CONTAINER_MAX_BUILDS
+
+        # daemon_build_snapshots
+        self._build_snapshots = configmanager.get_prop("daemon_build_snapshots") == "true"
+
+        # daemon_parallel_formats
+        self._parallel_formats = configmanager.get_prop("daemon_parallel_formats") == "true"
+
+        # daemon_format_priority
+        format_priority = configmanager.get_prop("daemon_format_priority") or \
+            DAEMON_DEFAULT_FORMAT_PRIORITY
+
+        self._format_priority = {}
+        for build_format in format_priority.split(","):
+            self._format_priority.setdefault(build_format.strip(), len(self._format_priority))
+
+        # daemon_build_cache
+        self._use_build_cache = configmanager.get_prop("daemon_build_cache") != "false"
+
+        # daemon_docker_backend
+        self._docker_backend = configmanager.get_prop("daemon_docker_backend")
+
+        # daemon_poll_workers
+        try:
+            self._poll_workers = int(configmanager.get_prop("daemon_poll_workers"))
+        except TypeError:
+            self._poll_workers = DAEMON_DEFAULT_POLL_WORKERS
+
+        # daemon_poll_timeout
+        try:
+            self._poll_timeout = int(configmanager.get_prop("daemon_poll_timeout"))
+        except TypeError:
+            self._poll_timeout = DAEMON_DEFAULT_POLL_TIMEOUT
+
+        # daemon_log_max_age
+        try:
+            self._log_max_age = int(configmanager.get_prop("daemon_log_max_age"))
+        except TypeError:
+            self._log_max_age = DAEMON_DEFAULT_LOG_MAX_AGE
+
+        # daemon_log_max_size
+        try:
+            self._log_max_size = int(configmanager.get_prop("daemon_log_max_size"))
+        except TypeError:
+            self._log_max_size = DAEMON_DEFAULT_LOG_MAX_SIZE
+
         # api_server
         self._api_server = configmanager.get_prop("api_server")
 
@@ -607,12 +1043,16 @@ class Daemon(Action):
             raise UserNotInDockerGroupException()
 
         # check if the docker image is imported
-        if not is_image_imported(CONTAINER_IMAGE):
+        if not is_image_imported(CONTAINER_IMAGE, self._docker):
             raise DockerImageMissingException(CONTAINER_IMAGE)
 
     def getStatus(self):
         self._daemon_info_lock.acquire()
-        daemon_info = self._daemon_info.copy()
+        daemon_info = {
+            "jobs": [copy.copy(job) for job in self._jobs.jobs()],
+            "scheduled_builds": self._jobs.pendingCount,
+            "running_builds": self._jobs.runningCount
+        }
         self._daemon_info_lock.release()
 
         return daemon_info
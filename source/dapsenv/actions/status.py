@@ -67,21 +67,27 @@ class Status(Action):
                 print("Running Builds:\t\t{}".format(res["running_builds"]))
                 print("Scheduled Builds:\t{}".format(res["scheduled_builds"]))
 
-                table_running = PrettyTable(["Project", "DC-File", "Branch", "Commit", "Started"])
-                table_scheduled = PrettyTable(["Project", "DC-File", "Branch", "Commit"])
+                table_running = PrettyTable(["ID", "Project", "DC-File", "Formats", "Branch",
+                                             "Commit", "Started"])
+                table_scheduled = PrettyTable(["ID", "Project", "DC-File", "Formats", "Branch",
+                                               "Commit"])
 
                 for job in res["jobs"]:
                     # append only running builds
                     if job["status"]:
-                        table_running.add_row([job["project"],
+                        table_running.add_row([job.get("id", ""),
+                                               job["project"],
                                                job["dc_file"],
+                                               ", ".join(job.get("formats", [])),
                                                job["branch"],
                                                job["commit"][:24],
                                                datetime.fromtimestamp(job["time_started"]).strftime("%m/%d/%Y %H:%M:%S")
                                                ])
                     else:
-                        table_scheduled.add_row([job["project"],
+                        table_scheduled.add_row([job.get("id", ""),
+                                                 job["project"],
                                                  job["dc_file"],
+                                                 ", ".join(job.get("formats", [])),
                                                  job["branch"],
                                                  job["commit"][:24]
                                                  ])
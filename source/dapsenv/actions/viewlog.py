@@ -70,7 +70,7 @@ class Viewlog(Action):
                 if "error" in res:
                     log.error("{}\n".format(res["error"]))
                 else:
-                    log.debug(b64decode(res["log"]).decode("ascii"))
+                    log.debug(b64decode(res["log"]).decode("utf-8", "replace"))
             except ValueError:
                 log.error("Invalid data received from API server.")
                 self._error = E_API_SERVER_INVALID_DATA_SENT
@@ -0,0 +1,52 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+from base64 import b64encode
+from dapsenv.exceptions import (APIInvalidRequestException, APIErrorException,
+                                JobLogNotFoundException)
+from dapsenv.joblog import read_job_log
+
+
+def handle(data, daemon):
+    if "job_id" not in data:
+        raise APIInvalidRequestException()
+
+    try:
+        job_id = int(data["job_id"])
+        offset = int(data.get("offset", 0))
+    except (TypeError, ValueError):
+        raise APIErrorException("The job id and the offset have to be numbers!")
+
+    if offset < 0:
+        raise APIErrorException("The offset must not be negative!")
+
+    try:
+        content, running = read_job_log(job_id, offset)
+    except JobLogNotFoundException as e:
+        # a scheduled job has no log yet
+        if not any(job["id"] == job_id and job["status"] == 0 for job in daemon.getJobList()):
+            raise APIErrorException(e.message)
+
+        content, running = b"", True
+
+    return {
+        "job_id": job_id,
+        "offset": offset + len(content),
+        "running": running,
+        "log": b64encode(content).decode("ascii")
+    }
@@ -16,12 +16,13 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import gzip
 import os
 import re
 from base64 import b64encode
 from dapsenv.autobuildconfig import _dcfiles_pattern
 from dapsenv.exceptions import APIInvalidRequestException, APIErrorException
-from dapsenv.general import LOG_DIR
+from dapsenv.general import LOG_DIR, LOG_STREAM_CHUNK_SIZE
 
 
 def handle(data, daemon):
@@ -37,7 +38,8 @@ def handle(data, daemon):
     if format_name != "html" and format_name != "single_html" and format_name != "pdf":
         raise APIErrorException("Format is not valid. Please choose between: html, single_html, and pdf")
 
-    pattern = re.compile("^build\_fail\_([a-zA-Z0-9\-]+)\_{}\_([0-9]+)\.log$".format(format_name))
+    # logs are stored gzip compressed - older logs are not
+    pattern = re.compile("^build\_fail\_([a-zA-Z0-9\-]+)\_{}\_([0-9]+)\.log(\.gz)?$".format(format_name))
 
     results = []
     files = os.listdir(LOG_DIR)
@@ -46,16 +48,22 @@ def handle(data, daemon):
         if match:
             res = match.groups()
             if res[0] == dc_file:
-                results.append(res[1])
+                results.append((res[1], file_name))
 
-    content = ""
+    content = []
 
     if not results:
         raise APIErrorException("No log entries found for this DC-File and Format!")
     else:
         results.sort()
 
-        with open("{}/build_fail_{}_{}_{}.log".format(LOG_DIR, dc_file, format_name, results[0]), "r") as log_file:
-            content = log_file.read()
+        log_path = "{}/{}".format(LOG_DIR, results[0][1])
+        opener = gzip.open if log_path.endswith(".gz") else open
 
-    return {"log": b64encode(content.encode("ascii")).decode("ascii")}
+        # the log is decompressed and encoded in chunks - a multiple of 3 bytes keeps the
+        # base64 encoding of the chunks free of padding
+        with opener(log_path, "rb") as log_file:
+            for chunk in iter(lambda: log_file.read(LOG_STREAM_CHUNK_SIZE * 3), b""):
+                content.append(b64encode(chunk).decode("ascii"))
+
+    return {"log": "".join(content)}
@@ -17,6 +17,7 @@
 # you may find current contact information at www.suse.com
 
 import asyncio
+import dapsenv.api.livelog as APILiveLog
 import dapsenv.api.status as APIStatus
 import dapsenv.api.triggerbuild as APITriggerBuild
 import dapsenv.api.projectlist as APIProjectList
@@ -92,6 +93,9 @@ class APIServer:
                             # view log
                             elif data["id"] == 4:
                                 response.update(APIViewLog.handle(data, self._daemon))
+                            # follow the log of a job
+                            elif data["id"] == 5:
+                                response.update(APILiveLog.handle(data, self._daemon))
                             else:
                                 # close if an invalid packet was sent
                                 yield from websocket.close()
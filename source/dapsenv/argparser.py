@@ -45,6 +45,7 @@ class ArgParser:
         self.addTokenAuthorizeCommand()
         self.addTokenDeauthorizeCommand()
         self.addViewLogCommand()
+        self.addFollowLogCommand()
 
     def print_help(self):
         self.parser.print_help()
@@ -290,3 +291,34 @@ class ArgParser:
             "DC-FILE", nargs=1, action="store",
             help="Name of the DC-File."
         )
+
+    def addFollowLogCommand(self):
+        default_ip = configmanager.get_prop("api_client_default_ip", default='127.0.0.1')
+
+        default_port = 5555
+        default_port = int(configmanager.get_prop("api_client_default_port", default=default_port))
+
+        cmd = self.cmdSubParser.add_parser(
+            "follow-log", aliases=["fl"], help="Shows the log of a running build while it is "
+            "written."
+        )
+
+        cmd.add_argument(
+            "--ip", "-i", action="store", default=default_ip,
+            help="Sets the IP of the API server."
+        )
+
+        cmd.add_argument(
+            "--port", "-p", action="store", default=default_port,
+            help="Sets the port of the API server."
+        )
+
+        cmd.add_argument(
+            "--offset", "-o", action="store", type=int, default=0,
+            help="Starts at this byte offset of the log."
+        )
+
+        cmd.add_argument(
+            "JOB-ID", nargs=1, action="store", type=int,
+            help="The id of the job (see the status command)."
+        )
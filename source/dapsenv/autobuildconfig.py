@@ -22,9 +22,13 @@ import threading
 from collections import OrderedDict
 from dapsenv.dcfile import DCFile
 from dapsenv.exceptions import AutoBuildConfigSyntaxErrorException, AutoBuildConfigNotFound
+from dapsenv.general import BUILD_FORMATS
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 
+import logging
+log = logging.getLogger(__name__)
+
 _dcfiles_pattern = re.compile("DC\-[a-zA-Z0-9\-_]+")
 
 
@@ -73,6 +77,7 @@ class AutoBuildConfig:
             data[index]["vcs_repodir"] = vcs_data.find("checkout").text
             data[index]["vcs_lastrev"] = vcs_data.find("lastrev").text
             data[index]["repo"] = Git.Repository(data[index]["vcs_repodir"])
+            data[index]["vcs_worktree"] = data[index]["repo"].worktree(data[index]["vcs_branch"])
             data[index]["maintainer"] = project.find("maintainer").text
             data[index]["meta"] = project.attrib["meta"]
             data[index]["remarks"] = project.attrib["remarks"]
@@ -81,11 +86,16 @@ class AutoBuildConfig:
             data[index]["notifications"]["emails"] = []
             data[index]["notifications"]["irc"] = []
             data[index]["dc_files"] = self._parse_dc_files(
-                vcs_data.find("checkout").text,
+                data[index]["vcs_worktree"],
                 dc_files,
                 data[index]["repo"],
                 data[index]["vcs_branch"]
             )
+            data[index]["formats"] = self._parse_formats(
+                project,
+                project_name,
+                data[index]["dc_files"]
+            )
 
             notification_elem = project.find("notifications")
 
@@ -116,10 +126,45 @@ class AutoBuildConfig:
 
         self._write_lock.release()
 
-    def _parse_dc_files(self, repo_dir, dc_files, repo, branch):
+    def _parse_formats(self, project, project_name, dc_files):
+        """Determines the formats what should be built of each DC file
+
+        A <formats/> element without attributes sets the formats of all DC files in the set,
+        a <formats dc="DC-..."/> element the formats of a single DC file. Without any
+        <formats/> element all formats are built.
+
+        :param etree.Element project: the 'set' element of the project
+        :param string project_name: the name of the project
+        :param OrderedDict dc_files: the DC files of the project
+        :return OrderedDict: the formats (list) of each DC file
+        """
+
+        default_formats = BUILD_FORMATS[:]
+        dc_formats = {}
+
+        for elem in project.findall("formats"):
+            formats = []
+
+            for build_format in (elem.text or "").split():
+                if build_format not in BUILD_FORMATS:
+                    log.warning("Unknown format %r in project %r is ignored. Valid formats: %s",
+                                build_format, project_name, ", ".join(BUILD_FORMATS))
+                elif build_format not in formats:
+                    formats.append(build_format)
+
+            if "dc" in elem.attrib:
+                dc_formats[elem.attrib["dc"]] = formats
+            else:
+                default_formats = formats
+
+        return OrderedDict((dc, dc_formats.get(dc, default_formats)) for dc in dc_files)
+
+    def _parse_dc_files(self, worktree, dc_files, repo, branch):
         """Remove all trash characters from the 'dcfiles' element
 
-        :param string repo_dir: path to the Repository
+        The DC files are read from the object store of the repository.
+
+        :param string worktree: path to the worktree of the documentation branch
         :param string dc_files: the content of the <dcfiles/> element
         :param Git.Repository repo: The repository object
         :param string branch: The branch for the documentation
@@ -130,15 +175,6 @@ class AutoBuildConfig:
         dc_files = OrderedDict()
 
         for dc in dcs:
-            # switch to given branch
-            currbranch = repo.branch()
-            if currbranch != branch:
-                repo.checkout(branch)
-
-            dc_files[dc] = DCFile("{}/{}".format(repo_dir, dc))
-
-            # switch back to other branch
-            if currbranch != branch:
-                repo.checkout(currbranch)
+            dc_files[dc] = DCFile("{}/{}".format(worktree, dc), repo.getFileContent(branch, dc))
 
         return dc_files
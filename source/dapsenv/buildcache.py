@@ -0,0 +1,178 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import hashlib
+import json
+import os
+import threading
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class BuildCache:
+    """Remembers which build archive was created from which inputs
+
+    An entry is keyed on the DC file, the format, the id of the container image, a hash
+    over the input files of the DC file and a hash over the build environment (the build
+    scripts and the dapsenv version). As long as the archive still exists in the builds
+    directory, a build with the same key produces the same archive and can be skipped.
+    """
+
+    def __init__(self, path, builds_dir, environment=""):
+        """Initializes the BuildCache class
+
+        :param string path: The path to the cache file
+        :param string builds_dir: The directory with the build archives
+        :param string environment: @see getEnvironmentHash()
+        """
+
+        self._path = path
+        self._builds_dir = builds_dir
+        self._environment = environment
+        self._lock = threading.Lock()
+        self._entries = {}
+
+        self.load()
+
+    def load(self):
+        """Loads the cache file - a missing or broken cache file results in an empty cache
+        """
+
+        try:
+            with open(self._path, "r") as cache_file:
+                self._entries = json.load(cache_file)
+        except IOError:
+            self._entries = {}
+        except ValueError:
+            log.warning("Build cache %r is broken and will be rebuilt.", self._path)
+            self._entries = {}
+
+    def get(self, dc_file, build_format, image_id, input_hash):
+        """Returns the archive of an earlier build with the same inputs
+
+        :param string dc_file: The name of the DC file
+        :param string build_format: The format
+        :param string image_id: The id of the container image
+        :param string input_hash: @see getInputHash()
+        :return string|None: The file name of the archive in the builds directory or None
+        """
+
+        key = self._key(dc_file, build_format, image_id, input_hash)
+
+        with self._lock:
+            file_name = self._entries.get(key)
+
+            if file_name is None:
+                return None
+
+            # the archive was removed in the meantime
+            if not os.path.isfile(os.path.join(self._builds_dir, file_name)):
+                del self._entries[key]
+                self._save()
+                return None
+
+        return file_name
+
+    def add(self, dc_file, build_format, image_id, input_hash, file_name):
+        """Remembers the archive of a successful build
+
+        :param string dc_file: The name of the DC file
+        :param string build_format: The format
+        :param string image_id: The id of the container image
+        :param string input_hash: @see getInputHash()
+        :param string file_name: The file name of the archive in the builds directory
+        """
+
+        with self._lock:
+            self._entries[self._key(dc_file, build_format, image_id, input_hash)] = file_name
+            self._save()
+
+    def prune(self, image_id=None):
+        """Removes entries which can't be used anymore
+
+        These are entries of archives which do not exist anymore, of other build
+        environments and - if an image id is given - of other container images.
+
+        :param string image_id: The id of the current container image
+        :return int: The amount of removed entries
+        """
+
+        with self._lock:
+            stale = []
+
+            for key, file_name in self._entries.items():
+                parts = key.split("|")
+
+                if parts[-1] != self._environment or (image_id and parts[2] != image_id) or \
+                        not os.path.isfile(os.path.join(self._builds_dir, file_name)):
+                    stale.append(key)
+
+            for key in stale:
+                del self._entries[key]
+
+            if stale:
+                self._save()
+
+        return len(stale)
+
+    @staticmethod
+    def getEnvironmentHash(files, version):
+        """Returns a hash over the build environment
+
+        :param list files: The paths of the files which define a build (like build.sh)
+        :param string version: The dapsenv version
+        :return string: The SHA-1 hash
+        """
+
+        sha1 = hashlib.sha1(version.encode("utf-8"))
+
+        for path in files:
+            with open(path, "rb") as f:
+                sha1.update(os.path.basename(path).encode("utf-8"))
+                sha1.update(hashlib.sha1(f.read()).digest())
+
+        return sha1.hexdigest()
+
+    @staticmethod
+    def getInputHash(object_ids):
+        """Returns a hash over the input files of a build
+
+        :param dict object_ids: The paths of the input files and their git object hashes
+        :return string: The SHA-1 hash
+        """
+
+        sha1 = hashlib.sha1()
+
+        for path in sorted(object_ids):
+            sha1.update("{} {}\n".format(path, object_ids[path]).encode("utf-8"))
+
+        return sha1.hexdigest()
+
+    def _key(self, dc_file, build_format, image_id, input_hash):
+        return "|".join((dc_file, build_format, image_id, input_hash, self._environment))
+
+    def _save(self):
+        """Writes the cache file - the caller has to hold the lock
+        """
+
+        tmp_path = "{}.tmp".format(self._path)
+        with open(tmp_path, "w") as cache_file:
+            json.dump(self._entries, cache_file)
+
+        os.replace(tmp_path, self._path)
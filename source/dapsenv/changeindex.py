@@ -0,0 +1,114 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import os
+
+
+class ChangeIndex:
+    """Maps the source files of a repository to the DC files which use them
+
+    Files are stored with their path relative to the repository. Images are stored by their
+    name without extension, because DAPS picks the image source from one of the format
+    directories below 'images/src/' (like images/src/png/ or images/src/svg/).
+    """
+
+    def __init__(self):
+        self._files = {}
+        self._dc_files = {}
+
+    def update(self, dc_file, files, images=()):
+        """Replaces the indexed files of a DC file
+
+        :param string dc_file: The name of the DC file
+        :param iterable files: Paths relative to the repository
+        :param iterable images: Image file names (as used in @fileref)
+        """
+
+        self.remove(dc_file)
+
+        keys = set(files)
+        keys.update(self._imageKey(image) for image in images)
+
+        self._dc_files[dc_file] = keys
+
+        for key in keys:
+            self._files.setdefault(key, set()).add(dc_file)
+
+    def remove(self, dc_file):
+        """Removes a DC file from the index
+
+        :param string dc_file: The name of the DC file
+        """
+
+        for key in self._dc_files.pop(dc_file, ()):
+            dc_files = self._files[key]
+            dc_files.discard(dc_file)
+
+            if not dc_files:
+                del self._files[key]
+
+    def getAffectedDCFiles(self, changed_files):
+        """Returns all DC files which use at least one of the changed files
+
+        :param iterable changed_files: Paths relative to the repository (like the output of
+                                       'git diff --name-only')
+        :return set: The names of the affected DC files
+        """
+
+        affected = set()
+
+        for path in changed_files:
+            if path.startswith("images/"):
+                path = self._imageKey(path)
+
+            affected.update(self._files.get(path, ()))
+
+        return affected
+
+    def getFiles(self, dc_file):
+        """Returns the indexed files of a DC file
+
+        :param string dc_file: The name of the DC file
+        :return set|None: The paths and image keys or None if the DC file is not indexed
+        """
+
+        if dc_file not in self._dc_files:
+            return None
+
+        return set(self._dc_files[dc_file])
+
+    def isImageKey(self, key):
+        """Checks if an indexed key stands for an image
+
+        :param string key: The key
+        :return bool: True for an image key
+        """
+
+        return key.startswith("images:")
+
+    def __contains__(self, dc_file):
+        return dc_file in self._dc_files
+
+    def _imageKey(self, path):
+        """Returns the index key of an image
+
+        :param string path: The image path or file name
+        :return string: The key
+        """
+
+        return "images:{}".format(os.path.splitext(os.path.basename(path))[0])
@@ -0,0 +1,213 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import threading
+from dapsenv.docker import Container
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class ContainerPool:
+    """Keeps spawned build containers ready for use
+
+    At least 'min_size' idle containers are kept warm in the background. A released
+    container gets reset and goes back into the pool, unless the pool already holds
+    'max_size' idle containers or the container has reached 'max_builds' builds. In
+    these cases the container gets killed.
+    """
+
+    def __init__(self, min_size, max_size, max_builds, factory=Container):
+        """Initializes the ContainerPool class
+
+        :param int min_size: How many idle containers should be kept ready
+        :param int max_size: How many idle containers may be kept at most
+        :param int max_builds: After how many builds a container gets replaced
+        :param callable factory: Creates a new (not yet spawned) container
+        """
+
+        self._min_size = min_size
+        self._max_size = max(min_size, max_size)
+        self._max_builds = max_builds
+        self._factory = factory
+
+        self._lock = threading.Lock()
+        self._idle = []
+        self._spawning = 0
+        self._builds = {}
+        self._closed = False
+
+    def start(self):
+        """Spawns the minimum amount of idle containers in the background
+        """
+
+        self._refill()
+
+    def shutdown(self):
+        """Kills all idle containers and stops refilling the pool
+
+        Containers which are leased at this time get killed when they are released.
+        """
+
+        with self._lock:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+
+        for container in idle:
+            self._kill(container)
+
+    def lease(self):
+        """Takes an idle container from the pool or spawns a new one
+
+        :return Container: A spawned container
+        """
+
+        with self._lock:
+            container = self._idle.pop() if self._idle else None
+
+        if container is None:
+            container = self._spawn()
+
+        self._refill()
+
+        return container
+
+    def release(self, container, reuse=True):
+        """Gives a leased container back to the pool
+
+        :param Container container: The container
+        :param bool reuse: False if the container must not be used again (for example
+                           because a build has crashed inside of it)
+        """
+
+        container_id = container.getContainerID()
+
+        with self._lock:
+            self._builds[container_id] = self._builds.get(container_id, 0) + 1
+
+            reuse = reuse and not self._closed and \
+                self._builds[container_id] < self._max_builds and \
+                len(self._idle) < self._max_size
+
+            if not reuse:
+                del self._builds[container_id]
+
+        if reuse:
+            try:
+                container.reset()
+            except Exception as e:
+                log.error("Could not reset container %s: %s", container_id, e)
+                reuse = False
+
+                with self._lock:
+                    del self._builds[container_id]
+
+        if reuse:
+            with self._lock:
+                reuse = not self._closed
+
+                if reuse:
+                    self._idle.append(container)
+                else:
+                    self._builds.pop(container_id, None)
+
+        if not reuse:
+            self._kill(container)
+            self._refill()
+
+    def discard(self, container):
+        """Forgets a leased container without killing it (useful for debugging)
+
+        :param Container container: The container
+        """
+
+        with self._lock:
+            self._builds.pop(container.getContainerID(), None)
+
+        self._refill()
+
+    def _spawn(self):
+        """Spawns a new container
+
+        :return Container: The container
+        """
+
+        container = self._factory()
+        container.spawn()
+
+        with self._lock:
+            self._builds[container.getContainerID()] = 0
+
+        return container
+
+    def _refill(self):
+        """Spawns idle containers in the background until the minimum size is reached
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+
+            missing = self._min_size - len(self._idle) - self._spawning
+            self._spawning += max(missing, 0)
+
+        for i in range(missing):
+            thread = threading.Thread(target=self._spawnIdle)
+            thread.start()
+
+    def _spawnIdle(self):
+        """Thread function to spawn an idle container
+        """
+
+        try:
+            container = self._spawn()
+        except Exception as e:
+            log.error("Could not spawn a container for the container pool: %s", e)
+
+            with self._lock:
+                self._spawning -= 1
+
+            return
+
+        with self._lock:
+            self._spawning -= 1
+            closed = self._closed
+
+            if not closed:
+                self._idle.append(container)
+
+        # the pool was shut down while the container got spawned
+        if closed:
+            self._kill(container)
+
+    def _kill(self, container):
+        """Kills a container which is not used anymore
+
+        :param Container container: The container
+        """
+
+        try:
+            container.kill()
+        except Exception as e:
+            log.error("Could not kill container %s: %s", container.getContainerID(), e)
+
+    @property
+    def idleCount(self):
+        with self._lock:
+            return len(self._idle)
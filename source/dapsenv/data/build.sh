@@ -1,34 +1,111 @@
 #!/bin/bash
-BUILD_LOG="/tmp/build_log"
-STATUS_FILE="/tmp/build_status"
-DAPS_OPTIONS=""
-FORMAT=$2
-FORMAT_FOLDER=""
-
-if [ "$FORMAT" = "single_html" ]; then
-  DAPS_OPTIONS="--single"
-  FORMAT="html"
-  FORMAT_FOLDER="single-html"
-else
-  FORMAT_FOLDER=$2
+# Builds one or more formats of a DC file
+#
+# Usage: build.sh <DC file> <formats> <repository path> <repository directory> [<build directory>]
+#
+# <formats> is a comma separated list (like html,single_html,pdf). The sources are profiled
+# and validated by the first run only - later runs in the same container (until cleanup.sh
+# is executed) build their formats from the same profiled sources. The results of each
+# format are written to /tmp/result/<format>/:
+#
+#   result.json        - status ("success" or "error"), compile_time (seconds, including the
+#                        validation), dapscmd and the product information
+#   build.log          - the output of DAPS
+#   documentation.tar  - the built documentation (only if the build was successful)
+#
+# The output of DAPS is also written to stdout while it is produced, so that the log of a
+# running build can be followed.
+
+RESULT_ROOT="/tmp/result"
+
+# the outcome of the validation, shared by all runs for the same sources
+VALIDATION="$RESULT_ROOT/validation"
+VALIDATE_LOG="$RESULT_ROOT/validate.log"
+
+mkdir -p $RESULT_ROOT
+
+# DAPS writes its output into the build directory - by default 'build' inside of the
+# repository, but a read-only snapshot of the repository needs a separate directory
+BUILD_ROOT=${5:-$3/build}
+
+DAPS="daps -vv -d $3/$1 --builddir=$BUILD_ROOT"
+
+# profile and validate the sources once for all formats
+if [ ! -f $VALIDATION ]; then
+  $DAPS validate 2>&1 | tee $VALIDATE_LOG
+  VALID=${PIPESTATUS[0]}
+  VALIDATE_TIME=$SECONDS
+
+  if [ $VALID -eq 0 ]; then
+    source $3/$1
+
+    # determine some product information - the same for all formats
+    if [ ! -z "$ROOTID" ]; then
+      XSLTPROCPARAM="--xinclude --stringparam rootid $ROOTID"
+    fi
+
+    PRODUCT=$(xsltproc $XSLTPROCPARAM /tmp/productname.xsl $BUILD_ROOT/.profiled/*/$MAIN)
+    PRODUCT_NUMBER=$(xsltproc $XSLTPROCPARAM /tmp/productnumber.xsl $BUILD_ROOT/.profiled/*/$MAIN)
+    GUIDE=$(xsltproc $XSLTPROCPARAM /tmp/guidename.xsl $BUILD_ROOT/.profiled/*/$MAIN)
+  fi
+
+  declare -p VALID VALIDATE_TIME PRODUCT PRODUCT_NUMBER GUIDE > $VALIDATION 2> /dev/null
+fi
+
+source $VALIDATION
+
+if [ $VALID -eq 0 ]; then
+  source $3/$1
 fi
 
-DAPS_CMD="daps -vv -d /tmp/build/$4/$1 $FORMAT $DAPS_OPTIONS"
-daps -vv -d /tmp/build/$4/$1 $FORMAT $DAPS_OPTIONS &> $BUILD_LOG
+BUILD_DIR_NAME=$(expr "$1" : '^DC\-\(.*\)$')
 
-if [ $? -eq 0 ]; then
-  source /tmp/build/$4/$1
+for BUILD_FORMAT in ${2//,/ }; do
+  RESULT_DIR="$RESULT_ROOT/$BUILD_FORMAT"
+  BUILD_LOG="$RESULT_DIR/build.log"
+  RESULT_FILE="$RESULT_DIR/result.json"
+  DAPS_OPTIONS=""
+  FORMAT=$BUILD_FORMAT
+  FORMAT_FOLDER=$BUILD_FORMAT
 
-  ARCHIVE_NAME="documentation_$2.tar"
-  BUILD_DIR_NAME=$(expr "$1" : '^DC\-\(.*\)$')
+  if [ "$FORMAT" = "single_html" ]; then
+    DAPS_OPTIONS="--single"
+    FORMAT="html"
+    FORMAT_FOLDER="single-html"
+  fi
+
+  DAPS_CMD="$DAPS $FORMAT $DAPS_OPTIONS"
+
+  rm -rf $RESULT_DIR
+  mkdir -p $RESULT_DIR
+
+  # all formats fail if the sources are not valid
+  if [ $VALID -ne 0 ]; then
+    cp $VALIDATE_LOG $BUILD_LOG
+    echo "{ \"status\": \"error\", \"compile_time\": $VALIDATE_TIME, \"dapscmd\": \"$DAPS_CMD\" }" > $RESULT_FILE
+    continue
+  fi
+
+  START=$SECONDS
+  echo "Building $BUILD_FORMAT: $DAPS_CMD"
+  $DAPS_CMD 2>&1 | tee $BUILD_LOG
+  RESULT=${PIPESTATUS[0]}
+  COMPILE_TIME=$((SECONDS - START + VALIDATE_TIME))
+
+  if [ $RESULT -ne 0 ]; then
+    echo "{ \"status\": \"error\", \"compile_time\": $COMPILE_TIME, \"dapscmd\": \"$DAPS_CMD\" }" > $RESULT_FILE
+    continue
+  fi
+
+  ARCHIVE_NAME="$RESULT_DIR/documentation.tar"
   if [ "$ROOTID" = "" ]; then
-    BUILD_DIR_PATH="$3/build/$BUILD_DIR_NAME/$FORMAT_FOLDER/$BUILD_DIR_NAME"
+    BUILD_DIR_PATH="$BUILD_ROOT/$BUILD_DIR_NAME/$FORMAT_FOLDER/$BUILD_DIR_NAME"
   else
-    BUILD_DIR_PATH="$3/build/$BUILD_DIR_NAME/$FORMAT_FOLDER/$ROOTID"
+    BUILD_DIR_PATH="$BUILD_ROOT/$BUILD_DIR_NAME/$FORMAT_FOLDER/$ROOTID"
   fi
 
   if [ "$FORMAT" = "pdf" ]; then
-    cd $3/build/$BUILD_DIR_NAME
+    cd $BUILD_ROOT/$BUILD_DIR_NAME
     tar cfv $ARCHIVE_NAME *.pdf > /dev/null
   else
     cd $BUILD_DIR_PATH
@@ -37,24 +114,8 @@ if [ $? -eq 0 ]; then
     fi
   fi
 
-  mv $ARCHIVE_NAME /tmp
-
-  # determine some product information and put it into /tmp/doc_info.json as JSON string
-  # this will be used for DAPSEnv
-  if [ ! -z "$ROOTID" ]; then
-    XSLTPROCPARAM="--xinclude --stringparam rootid $ROOTID"
-  fi
-
-  PRODUCT=$(xsltproc $XSLTPROCPARAM /tmp/productname.xsl $3/build/.profiled/*/$MAIN)
-  PRODUCT_NUMBER=$(xsltproc $XSLTPROCPARAM /tmp/productnumber.xsl $3/build/.profiled/*/$MAIN)
-  GUIDE=$(xsltproc $XSLTPROCPARAM /tmp/guidename.xsl $3/build/.profiled/*/$MAIN)
-
-  # create doc_info.json
-  echo "{ \"product\": \"$PRODUCT\", \"productnumber\": \"$PRODUCT_NUMBER\", \"guide\": \"$GUIDE\", \"dapscmd\": \"$DAPS_CMD\" }" > /tmp/doc_info.json
-
-  echo "success" > $STATUS_FILE
-  exit 0
-fi
+  # build result and product information for DAPSEnv
+  echo "{ \"status\": \"success\", \"compile_time\": $COMPILE_TIME, \"product\": \"$PRODUCT\", \"productnumber\": \"$PRODUCT_NUMBER\", \"guide\": \"$GUIDE\", \"dapscmd\": \"$DAPS_CMD\" }" > $RESULT_FILE
+done
 
-echo "{ \"dapscmd\": \"$DAPS_CMD\" }" > /tmp/doc_info.json
-echo "error" > $STATUS_FILE
+exit 0
@@ -1,7 +1,18 @@
 #!/bin/bash
 # Deletes all tmp files what were created by one build-run
+#
+# Usage: cleanup.sh [--reset]
+#
+# --reset also removes the copied repository, so that the container can be prepared for
+# another build
 
 cd /tmp
-rm -rf build_* *.json
-cd /tmp/build/*
-rm -rf build
+rm -rf build_* *.json scratch result
+
+if [ "$1" = "--reset" ]; then
+  rm -rf /tmp/build
+# only copied repositories contain a build directory - snapshots are read-only
+elif [ -d /tmp/build ]; then
+  cd /tmp/build/*
+  rm -rf build
+fi
@@ -22,8 +22,16 @@ from dapsenv.exceptions import DCFileMAINNotFoundException
 
 
 class DCFile:
-    def __init__(self, path):
+    def __init__(self, path, content=None):
+        """Initializes the DCFile class
+
+        :param string path: The path to the DC file
+        :param string content: The content of the DC file - if not given, the file is read
+                               from the path
+        """
+
         self._path = path
+        self._content = content
         self._main = None
         self._main_path = None
         self._rootid = None
@@ -34,20 +42,26 @@ class DCFile:
         self.tryParse()
 
     def tryParse(self):
-        with open(self._path, "r") as dcfile:
-            for line in dcfile:
-                if self._search_pattern_main.match(line):
-                    self._main = self._getValue(line)
-                    self._main_path = "{}/xml/{}".format(
-                        os.path.dirname(os.path.realpath(self._path)),
-                        self._main
-                    )
-                elif self._search_pattern_rootid.match(line):
-                    self._rootid = self._getValue(line)
+        if self._content is None:
+            with open(self._path, "r") as dcfile:
+                self._parseLines(dcfile)
+        else:
+            self._parseLines(self._content.splitlines(True))
 
         if not self._main:
             raise DCFileMAINNotFoundException(self._path)
 
+    def _parseLines(self, lines):
+        for line in lines:
+            if self._search_pattern_main.match(line):
+                self._main = self._getValue(line)
+                self._main_path = "{}/xml/{}".format(
+                    os.path.dirname(os.path.realpath(self._path)),
+                    self._main
+                )
+            elif self._search_pattern_rootid.match(line):
+                self._rootid = self._getValue(line)
+
     def _getValue(self, line):
         line = line.strip("\n")
         pos = line.find("=")
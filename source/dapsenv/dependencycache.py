@@ -0,0 +1,163 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import dapsenv.xslt as xslt
+import hashlib
+import json
+import os
+import threading
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class DependencyCache:
+    """Caches the used files of a DC file on disk
+
+    The entries are keyed on repository, branch, MAIN file and ROOTID. Each entry remembers
+    the content hashes of the files the used files were determined from, and is only
+    reused as long as none of these files has changed.
+    """
+
+    def __init__(self, path):
+        """Initializes the DependencyCache class
+
+        :param string path: The path to the cache file
+        """
+
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._changed = False
+
+        self.load()
+
+    def load(self):
+        """Loads the cache file - a missing or broken cache file results in an empty cache
+        """
+
+        try:
+            with open(self._path, "r") as cache_file:
+                self._entries = json.load(cache_file)
+        except IOError:
+            self._entries = {}
+        except ValueError:
+            log.warning("Dependency cache %r is broken and will be rebuilt.", self._path)
+            self._entries = {}
+
+    def save(self):
+        """Writes the cache file if the cache has changed
+        """
+
+        with self._lock:
+            if not self._changed:
+                return
+
+            tmp_path = "{}.tmp".format(self._path)
+            with open(tmp_path, "w") as cache_file:
+                json.dump(self._entries, cache_file)
+
+            os.replace(tmp_path, self._path)
+            self._changed = False
+
+    def getAllUsedFiles(self, repo, branch, main, rootid, graphs=None):
+        """Get all used files of an XML MAIN file - from the cache if possible
+
+        :param string repo: The path to the repository
+        :param string branch: The branch of the repository
+        :param string main: the main file of a documentation
+        :param string rootid: the rootid of a DC file
+        :param dict graphs: Include graphs of the current commit keyed on their MAIN file. On
+                            a cache miss, the graph of the MAIN file is taken from here or
+                            gets added, so that each MAIN file is parsed only once.
+        :return set: A set of all used files
+        """
+
+        return set(self.getDependencies(repo, branch, main, rootid, graphs)["used_files"])
+
+    def getDependencies(self, repo, branch, main, rootid, graphs=None):
+        """Get the used files, images and dependency files of a root id - from the cache if
+        possible
+
+        :param string repo: The path to the repository
+        :param string branch: The branch of the repository
+        :param string main: the main file of a documentation
+        :param string rootid: the rootid of a DC file
+        :param dict graphs: @see getAllUsedFiles()
+        :return dict: With 'used_files', 'images' and 'dependencies' as keys. All files are
+                      relative to the directory of the MAIN file.
+        """
+
+        key = "|".join((repo, branch, main, rootid))
+        main_dir = os.path.dirname(os.path.abspath(main))
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry and "images" in entry and \
+                all(self._hashFile(main_dir, path) == file_hash
+                    for path, file_hash in entry["dependencies"].items()):
+            return {
+                "used_files": set(entry["used_files"]),
+                "images": set(entry["images"]),
+                "dependencies": set(entry["dependencies"])
+            }
+
+        if graphs is None:
+            graphs = {}
+
+        if main not in graphs:
+            graphs[main] = xslt.IncludeGraph(main)
+
+        used_files, dependencies = graphs[main].getUsedAndDependencyFiles(rootid)
+        images = graphs[main].getImages(rootid)
+
+        entry = {
+            "used_files": sorted(used_files),
+            "images": sorted(images),
+            "dependencies": dict((path, self._hashFile(main_dir, path)) for path in dependencies)
+        }
+
+        with self._lock:
+            self._entries[key] = entry
+            self._changed = True
+
+        return {
+            "used_files": used_files,
+            "images": images,
+            "dependencies": dependencies
+        }
+
+    def _hashFile(self, directory, path):
+        """Returns the content hash of a file
+
+        :param string directory: The directory the path is relative to
+        :param string path: The path of the file
+        :return string|None: The SHA-1 hash or None if the file does not exist
+        """
+
+        sha1 = hashlib.sha1()
+
+        try:
+            with open(os.path.join(directory, path), "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    sha1.update(chunk)
+        except IOError:
+            return None
+
+        return sha1.hexdigest()
@@ -16,24 +16,49 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import io
+import json
 import os
 import shlex
+import shutil
 import subprocess
+import tarfile
+import tempfile
 import time
 from collections import OrderedDict
 from dapsenv.exceptions import (ContainerNotSpawnedException, ContainerAlreadySpawnedException,
                                 ContainerPreparationMissingException,
-                                UnexpectedStderrOutputException, ContainerFileCreationFailed)
-from dapsenv.general import CONTAINER_REPO_DIR, CONTAINER_IMAGE, SOURCE_DIR, HOME_DIR
+                                ContainerPreparationFailedException,
+                                ContainerBuildFileNotAvailableException,
+                                UnexpectedStderrOutputException, ContainerFileCreationFailed,
+                                DockerAPIException)
+from dapsenv.general import (CONTAINER_REPO_DIR, CONTAINER_IMAGE, SOURCE_DIR, HOME_DIR,
+                             SNAPSHOTS_DIR, CONTAINER_SNAPSHOTS_DIR, CONTAINER_SCRATCH_DIR,
+                             CONTAINER_RESULT_DIR, TMP_DIR, LOG_STREAM_CHUNK_SIZE)
 from random import randint
 
+# scripts which are copied into /tmp of every container
+CONTAINER_SCRIPTS = ["build.sh", "cleanup.sh", "guidename.xsl", "productname.xsl",
+                     "productnumber.xsl", "rootid.xsl"]
+
+# the directory bit of a file mode reported by the Docker Engine API (Go's os.ModeDir)
+DOCKER_MODE_DIR = 1 << 31
+
 
 class Container:
 
-    def __init__(self):
+    def __init__(self, snapshots=False):
+        """Initializes the Container class
+
+        :param bool snapshots: Mounts the snapshot directory of the host (read-only) into
+                               the container, so that it can build snapshots
+        """
+
+        self._snapshots = snapshots
         self._spawned = False
         self._prepdone = False
         self._container_repopath = ""
+        self._builddir = ""
 
     def spawn(self):
         """This function sets up a Docker container
@@ -44,7 +69,13 @@ class Container:
         if self._spawned:
             raise ContainerAlreadySpawnedException()
 
-        cmd = "docker run -t -d {} /bin/sh -c \"while true;do sleep 1;done\"".format(CONTAINER_IMAGE)
+        volumes = ""
+        if self._snapshots:
+            volumes = "-v {}:{}:ro ".format(SNAPSHOTS_DIR, CONTAINER_SNAPSHOTS_DIR)
+
+        cmd = "docker run -t -d {}{} /bin/sh -c \"while true;do sleep 1;done\"".format(
+            volumes, CONTAINER_IMAGE
+        )
 
         with open("/dev/null", "w") as devnull:
             process = subprocess.Popen(shlex.split(cmd), stdout=subprocess.PIPE, stderr=devnull)
@@ -69,6 +100,7 @@ class Container:
         self._prepdone = False
         self._container_id = ""
         self._container_repopath = ""
+        self._builddir = ""
 
     def getContainerID(self):
         """Returns the ID of this container
@@ -92,11 +124,16 @@ class Container:
 
         return self._container_repopath
 
-    def prepare(self, repopath):
-        """Prepares a container (copies the documentation repository into it)
+    def prepare(self, repopath, commit="HEAD"):
+        """Prepares a container (streams the documentation repository into it)
+
+        Only the files of the given commit are copied into the container. The '.git'
+        directory, old build results and untracked files stay outside. The files are
+        unpacked before this method returns.
 
         :param string repopath: Specifes the path, where the repository of the Documentation is
                                 located
+        :param string commit: The commit what should get built
         """
 
         if not self._spawned:
@@ -104,31 +141,68 @@ class Container:
 
         repodir = self._get_repodir(repopath)
         self._repodir = repodir
-        self._prepdone = True
         self._container_repopath = "{}/{}".format(CONTAINER_REPO_DIR, repodir)
+        self._builddir = "{}/build".format(self._container_repopath)
 
         self.execute("mkdir -p {}".format(CONTAINER_REPO_DIR))
-        self.put(repopath, CONTAINER_REPO_DIR)
-        self.put("{}/data/build.sh".format(SOURCE_DIR), "/tmp")
-        self.put("{}/data/cleanup.sh".format(SOURCE_DIR), "/tmp")
-        self.put("{}/data/guidename.xsl".format(SOURCE_DIR), "/tmp")
-        self.put("{}/data/productname.xsl".format(SOURCE_DIR), "/tmp")
-        self.put("{}/data/productnumber.xsl".format(SOURCE_DIR), "/tmp")
-        self.put("{}/data/rootid.xsl".format(SOURCE_DIR), "/tmp")
-
-        # a timing issue appears sometimes - that's why we need to make sure that the
-        # file is really copied over before we go ahead
-        count = 0
-        while count < 10:
-            if self.fileAvailable("/tmp/build.sh"):
-                return
-            else:
-                count += 1
-                time.sleep(1)
 
-        raise ContainerPreparationMissingException(
-            "/tmp/build.sh is not available inside the container."
+        # stream the files of the commit into the container
+        cmd = ["git", "archive", "--prefix={}/".format(repodir), commit]
+        archive = subprocess.Popen(cmd, cwd=repopath, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+
+        unpack_error = None
+
+        try:
+            self._unpack(archive.stdout, CONTAINER_REPO_DIR)
+        except ContainerPreparationFailedException as e:
+            unpack_error = e
+        finally:
+            archive.stdout.close()
+            stderr = archive.stderr.read().decode("utf-8")
+            archive.wait()
+
+        # an error of git explains a failed unpacking as well
+        if archive.returncode:
+            raise ContainerPreparationFailedException(" ".join(cmd), stderr)
+
+        if unpack_error:
+            raise unpack_error
+
+        # copy the build scripts into the container
+        self._unpack(self._get_scripts_archive(), "/tmp")
+
+        self._prepdone = True
+
+    def prepareSnapshot(self, snapshot):
+        """Prepares a container to build a snapshot (@see SnapshotStore)
+
+        The snapshot is read-only inside the container - DAPS writes its output into a
+        scratch directory instead.
+
+        :param string snapshot: The path to the snapshot of the repository on the host
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        if not self._snapshots:
+            raise ContainerPreparationFailedException(
+                "prepareSnapshot", "The snapshot directory is not mounted in this container."
+            )
+
+        self._repodir = self._get_repodir(snapshot)
+        self._container_repopath = "{}/{}".format(
+            CONTAINER_SNAPSHOTS_DIR, os.path.relpath(snapshot, SNAPSHOTS_DIR)
         )
+        self._builddir = "{}/build".format(CONTAINER_SCRATCH_DIR)
+
+        self.execute("mkdir -p {}".format(CONTAINER_SCRATCH_DIR))
+
+        # copy the build scripts into the container
+        self._unpack(self._get_scripts_archive(), "/tmp")
+
+        self._prepdone = True
 
     def execute(self, command):
         """Executes a command inside a container
@@ -154,6 +228,34 @@ class Container:
 
         return output
 
+    def executeStream(self, command, output):
+        """Executes a command inside a container and writes its output to a file object
+        while it is produced
+
+        stdout and stderr are written to the same file object. At most one chunk of the
+        output is held in memory.
+
+        :param string command: The command
+        :param file output: A writable binary file object
+        :return int: The exit code of the command
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        cmd = "docker exec {} {}".format(self.getContainerID(), command)
+        process = subprocess.Popen(
+            shlex.split(cmd),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+
+        for chunk in iter(lambda: process.stdout.read1(LOG_STREAM_CHUNK_SIZE), b""):
+            output.write(chunk)
+            output.flush()
+
+        return process.wait()
+
     def put(self, file_name, destination):
         """Puts a file or a directory into the container
 
@@ -184,6 +286,26 @@ class Container:
         cmd = "docker cp {}:{} {}".format(self.getContainerID(), file_name, destination)
         subprocess.Popen(shlex.split(cmd), stdout=devnull)
 
+    def fetchArchive(self, path, fileobj):
+        """Fetches a file or directory from the container as tar archive
+
+        :param string path: The file/directory in the docker container
+        :param file fileobj: A writable file object for the archive
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        cmd = ["docker", "cp", "{}:{}".format(self.getContainerID(), path), "-"]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        shutil.copyfileobj(process.stdout, fileobj)
+        stderr = process.stderr.read().decode("utf-8")
+        process.wait()
+
+        if process.returncode:
+            raise UnexpectedStderrOutputException(" ".join(cmd), stderr)
+
     def fileAvailable(self, file_name):
         """Checks if a file is available inside the container
 
@@ -243,52 +365,49 @@ class Container:
         :return dict: A dictionary with the build results
         """
 
-        if not self._spawned:
-            raise ContainerNotSpawnedException()
+        return next(self.buildDocumentations(dc_file, [build_format]))
 
-        if not self._prepdone:
-            raise ContainerPreparationMissingException()
-
-        data = {}
+    def buildDocumentations(self, dc_file, build_formats, log_path=os.devnull):
+        """Tries to build the documentation in several formats
 
-        # save start time
-        start = int(time.time())
+        The formats are built one after another in the given order, but the sources are
+        profiled and validated only once for all formats. The result of each format is
+        fetched from the container as soon as the format is built.
 
-        # start build process
-        cmd = "/tmp/build.sh {} {} {} {}".format(
-            dc_file, build_format, self.getContainerRepoPath(), self._repodir
-        )
-        self.execute(cmd)
+        :param string dc_file: The name of the DC file
+        :param list build_formats: The formats what should be built (like html, pdf etc.)
+        :param string log_path: The output of the build is appended to this file while the
+                                build is running
+        :return generator: Yields a dictionary with the build results for each format. The
+                           build log ('log_name') and the documentation archive of a
+                           successful build ('archive_name') are copied to temporary files
+                           on the host - the caller has to remove them.
+        """
 
-        # get build status (success or error)
-        status = self.execute("cat /tmp/build_status")
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
 
-        # raise exception if something went wrong with the last command
-        if status["stderr"]:
-            raise UnexpectedStderrOutputException(cmd, status["stderr"])
+        if not self._prepdone:
+            raise ContainerPreparationMissingException()
 
-        # get build output
-        log = self.execute("cat /tmp/build_log")
+        for build_format in build_formats:
+            # start build process
+            cmd = "/tmp/build.sh {} {} {} {} {}".format(
+                dc_file, build_format, self.getContainerRepoPath(), self._repodir,
+                self._builddir
+            )
 
-        # raise exception if something went wrong with the last command
-        if log["stderr"]:
-            raise UnexpectedStderrOutputException(cmd, log["stderr"])
+            with open(log_path, "ab") as log:
+                self.executeStream(cmd, log)
 
-        # determine if the build was successful or not
-        if "success" in status["stdout"]:
-            result = True
-        else:
-            result = False
+            with tempfile.TemporaryFile(dir=TMP_DIR) as archive:
+                self.fetchArchive("{}/{}".format(CONTAINER_RESULT_DIR, build_format), archive)
+                archive.seek(0)
 
-        # save data to dict
-        data["dc_file"] = dc_file
-        data["format"] = build_format
-        data["build_log"] = log["stdout"]
-        data["build_status"] = result
-        data["compile_time"] = int(time.time()) - start
-        data["archive_name"] = "/tmp/documentation_{}.tar".format(build_format)
+                with tarfile.open(fileobj=archive) as tar:
+                    result = self._readResult(tar, dc_file, build_format)
 
-        return data
+            yield result
 
     def cleanup(self):
         """Cleans the container from temporary files
@@ -302,6 +421,124 @@ class Container:
 
         self.execute("/tmp/cleanup.sh")
 
+    def reset(self):
+        """Removes the repository and all build results so that the container can be
+        prepared for another build
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        cmd = "/tmp/cleanup.sh --reset"
+        res = self.execute(cmd)
+
+        if res["stderr"]:
+            raise UnexpectedStderrOutputException(cmd, res["stderr"])
+
+        self._prepdone = False
+        self._container_repopath = ""
+        self._builddir = ""
+
+    def _readResult(self, tar, dc_file, build_format):
+        """Reads the build result of a format from its fetched result directory
+
+        :param tarfile.TarFile tar: The fetched result directory of the format
+        :param string dc_file: The name of the DC file
+        :param string build_format: The format
+        :return dict: The build result
+        """
+
+        # the fetched directory is the top level entry of the archive
+        try:
+            manifest = json.loads(
+                tar.extractfile("{}/result.json".format(build_format)).read().decode("utf-8")
+            )
+            log = tar.extractfile("{}/build.log".format(build_format))
+        except KeyError:
+            raise ContainerBuildFileNotAvailableException(
+                "No build result for format '{}' of '{}'.".format(build_format, dc_file)
+            )
+
+        result = {
+            "dc_file": dc_file,
+            "format": build_format,
+            "build_status": manifest.pop("status") == "success",
+            "compile_time": manifest.pop("compile_time"),
+            "log_name": self._extractTemporary(log, "build_log_", ".log"),
+            "archive_name": None
+        }
+
+        # product information and the DAPS command
+        result.update(manifest)
+
+        if result["build_status"]:
+            try:
+                result["archive_name"] = self._extractTemporary(
+                    tar.extractfile("{}/documentation.tar".format(build_format)), "documentation_",
+                    ".tar"
+                )
+            except Exception:
+                os.remove(result["log_name"])
+                raise
+
+        return result
+
+    def _extractTemporary(self, member, prefix, suffix):
+        """Copies a member of a tar archive into a temporary file on the host
+
+        :param file member: The member as file object
+        :param string prefix: The prefix of the file name
+        :param string suffix: The suffix of the file name
+        :return string: The path to the temporary file
+        """
+
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=TMP_DIR)
+
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(member, f, LOG_STREAM_CHUNK_SIZE)
+
+        return path
+
+    def _unpack(self, archive, destination):
+        """Unpacks a tar archive inside the container and waits until it is done
+
+        :param bytes|file archive: The archive or a readable pipe that delivers it
+        :param string destination: The directory inside the container
+        """
+
+        cmd = ["docker", "exec", "-i", self.getContainerID(), "tar", "-x", "-C", destination]
+
+        with open("/dev/null", "w") as devnull:
+            if isinstance(archive, bytes):
+                process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=devnull,
+                                           stderr=subprocess.PIPE)
+                stderr = process.communicate(archive)[1]
+            else:
+                process = subprocess.Popen(cmd, stdin=archive, stdout=devnull,
+                                           stderr=subprocess.PIPE)
+                stderr = process.communicate()[1]
+
+        if process.returncode:
+            raise ContainerPreparationFailedException(" ".join(cmd), stderr.decode("utf-8"))
+
+    def _get_scripts_archive(self):
+        """Returns a tar archive of all scripts which are required for a build
+
+        :return bytes: The archive
+        """
+
+        def reset_owner(info):
+            info.uid = info.gid = 0
+            info.uname = info.gname = "root"
+            return info
+
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tar:
+            for name in CONTAINER_SCRIPTS:
+                tar.add("{}/data/{}".format(SOURCE_DIR, name), arcname=name, filter=reset_owner)
+
+        return data.getvalue()
+
     def _get_repodir(self, repopath):
         """Returns the directory name of a specified repository path
 
@@ -317,3 +554,194 @@ class Container:
 
         repopath = repopath.split("/")
         return repopath[-1]
+
+
+class APIContainer(Container):
+    """A Container which is controlled over the Docker Engine API instead of the docker CLI
+
+    All containers share the connections of one DockerClient.
+    """
+
+    def __init__(self, client, snapshots=False):
+        """Initializes the APIContainer class
+
+        :param DockerClient client: The client for the Docker Engine API
+        :param bool snapshots: @see Container.__init__()
+        """
+
+        Container.__init__(self, snapshots)
+        self._client = client
+
+    def spawn(self):
+        """@see Container.spawn()
+        """
+
+        if self._spawned:
+            raise ContainerAlreadySpawnedException()
+
+        binds = []
+        if self._snapshots:
+            binds.append("{}:{}:ro".format(SNAPSHOTS_DIR, CONTAINER_SNAPSHOTS_DIR))
+
+        container_id = self._client.createContainer(
+            CONTAINER_IMAGE, ["/bin/sh", "-c", "while true;do sleep 1;done"], tty=True,
+            binds=binds
+        )
+
+        try:
+            self._client.startContainer(container_id)
+        except DockerAPIException:
+            self._client.removeContainer(container_id)
+            raise
+
+        self._spawned = True
+        self._container_id = container_id
+
+        return self._container_id
+
+    def kill(self):
+        """@see Container.kill()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        self._client.removeContainer(self.getContainerID())
+
+        self._spawned = False
+        self._prepdone = False
+        self._container_id = ""
+        self._container_repopath = ""
+        self._builddir = ""
+
+    def execute(self, command):
+        """@see Container.execute()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        output = self._client.execute(self.getContainerID(), shlex.split(command))
+
+        return {
+            "stdout": output["stdout"].decode("utf-8"),
+            "stderr": output["stderr"].decode("utf-8")
+        }
+
+    def executeStream(self, command, output):
+        """@see Container.executeStream()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        return self._client.executeStream(self.getContainerID(), shlex.split(command), output)
+
+    def put(self, file_name, destination):
+        """@see Container.put()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        # like 'docker cp': put it into the destination if that's a directory
+        stat = self._client.statPath(self.getContainerID(), destination)
+        if stat and stat["mode"] & DOCKER_MODE_DIR:
+            directory, name = destination, os.path.basename(file_name.rstrip("/"))
+        else:
+            directory, name = os.path.split(destination)
+
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w") as tar:
+            tar.add(file_name, arcname=name)
+
+        self._client.putArchive(self.getContainerID(), directory, data.getvalue())
+
+    def fetch(self, file_name, destination):
+        """@see Container.fetch()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        # like 'docker cp': put it into the destination if that's a directory
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, os.path.basename(file_name.rstrip("/")))
+
+        with tempfile.TemporaryFile(dir=TMP_DIR) as archive:
+            self._client.getArchive(self.getContainerID(), file_name, archive)
+            archive.seek(0)
+
+            self._extract(archive, destination)
+
+    def _extract(self, archive, destination):
+        """Extracts a fetched tar archive
+
+        :param file archive: A readable file object of the archive
+        :param string destination: The destination of the top level entry of the archive
+        """
+
+        with tarfile.open(fileobj=archive) as tar:
+            for member in tar:
+                # the archive contains the fetched file or directory as its top level entry
+                parts = member.name.split("/")[1:]
+                if ".." in parts:
+                    continue
+
+                path = os.path.join(destination, *parts)
+
+                if member.isdir():
+                    os.makedirs(path, exist_ok=True)
+                elif member.isfile():
+                    with open(path, "wb") as f:
+                        shutil.copyfileobj(tar.extractfile(member), f)
+
+    def fetchArchive(self, path, fileobj):
+        """@see Container.fetchArchive()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        self._client.getArchive(self.getContainerID(), path, fileobj)
+
+    def fileAvailable(self, file_name):
+        """@see Container.fileAvailable()
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        return self._client.statPath(self.getContainerID(), file_name) is not None
+
+    def fileCreate(self, file_name, content):
+        """@see Container.fileCreate()
+
+        The file is available as soon as this method returns.
+        """
+
+        if not self._spawned:
+            raise ContainerNotSpawnedException()
+
+        data = content.encode("utf-8")
+        info = tarfile.TarInfo(os.path.basename(file_name))
+        info.size = len(data)
+        info.mtime = time.time()
+
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            tar.addfile(info, io.BytesIO(data))
+
+        self._client.putArchive(self.getContainerID(), os.path.dirname(file_name),
+                                archive.getvalue())
+
+    def _unpack(self, archive, destination):
+        """@see Container._unpack()
+        """
+
+        try:
+            self._client.putArchive(self.getContainerID(), destination, archive)
+        except DockerAPIException as e:
+            raise ContainerPreparationFailedException(
+                "PUT archive {}".format(destination), e.message
+            )
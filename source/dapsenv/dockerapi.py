@@ -0,0 +1,506 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import base64
+import http.client
+import json
+import select
+import shutil
+import socket
+import struct
+import threading
+from dapsenv.exceptions import DockerAPIException
+from dapsenv.general import (DOCKER_SOCKET_PATH, DOCKER_API_VERSION, DOCKER_API_POOL_SIZE,
+                             LOG_STREAM_CHUNK_SIZE)
+from urllib.parse import quote, urlencode
+
+import logging
+log = logging.getLogger(__name__)
+
+# stream types of a multiplexed exec output
+STREAM_STDOUT = 1
+STREAM_STDERR = 2
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """A HTTP connection over a unix domain socket
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        """Initializes the UnixHTTPConnection class
+
+        :param string socket_path: The path to the unix domain socket
+        :param int timeout: The socket timeout in seconds
+        """
+
+        http.client.HTTPConnection.__init__(self, "localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+class DockerClient:
+    """Talks to the Docker Engine API over its unix domain socket
+
+    Connections are kept open and reused by all threads, so that a call costs a single
+    request instead of starting a docker CLI process.
+    """
+
+    def __init__(self, socket_path=DOCKER_SOCKET_PATH, pool_size=DOCKER_API_POOL_SIZE,
+                 timeout=None):
+        """Initializes the DockerClient class
+
+        :param string socket_path: The path to the Docker socket
+        :param int pool_size: How many idle connections should be kept open
+        :param int timeout: The socket timeout in seconds
+        """
+
+        self._socket_path = socket_path
+        self._pool_size = pool_size
+        self._timeout = timeout
+
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def createContainer(self, image, cmd, tty=False, binds=None):
+        """Creates a new container
+
+        :param string image: The name of the image
+        :param list cmd: The command of the container
+        :param bool tty: Allocates a pseudo-TTY
+        :param list binds: Volume bindings like 'host-path:container-path:ro'
+        :return string: The id of the container
+        """
+
+        config = {"Image": image, "Cmd": cmd, "Tty": tty, "HostConfig": {"Binds": binds or []}}
+
+        return self._json("POST", "/containers/create", body=config)["Id"]
+
+    def startContainer(self, container_id):
+        """Starts a created container
+
+        :param string container_id: The id of the container
+        """
+
+        self._request("POST", "/containers/{}/start".format(container_id))
+
+    def removeContainer(self, container_id, force=True):
+        """Removes a container
+
+        :param string container_id: The id of the container
+        :param bool force: Kills the container if it is running
+        """
+
+        self._request("DELETE", "/containers/{}".format(container_id),
+                      query={"force": "1" if force else "0"})
+
+    def inspectContainer(self, container_id):
+        """Returns low-level information about a container
+
+        :param string container_id: The id of the container
+        :return dict: The container information
+        """
+
+        return self._json("GET", "/containers/{}/json".format(container_id))
+
+    def inspectImage(self, image):
+        """Returns low-level information about an image
+
+        :param string image: The name of the image
+        :return dict: The image information
+        """
+
+        return self._json("GET", "/images/{}/json".format(quote(image, safe="/:")))
+
+    def imageExists(self, image):
+        """Checks if an image is available
+
+        :param string image: The name of the image
+        :return bool: True if the image exists
+        """
+
+        try:
+            self.inspectImage(image)
+        except DockerAPIException as e:
+            if e.status == 404:
+                return False
+
+            raise
+
+        return True
+
+    def execute(self, container_id, cmd):
+        """Executes a command inside a running container
+
+        :param string container_id: The id of the container
+        :param list cmd: The command and its arguments
+        :return dict: With 'stdout', 'stderr' (both bytes) and 'exit_code' as keys
+        """
+
+        exec_id = self._createExec(container_id, cmd)
+
+        data = self._request("POST", "/exec/{}/start".format(exec_id),
+                             body={"Detach": False, "Tty": False})
+
+        output = self.demultiplex(data)
+        output["exit_code"] = self._json("GET", "/exec/{}/json".format(exec_id))["ExitCode"]
+
+        return output
+
+    def executeStream(self, container_id, cmd, output, chunk_size=LOG_STREAM_CHUNK_SIZE):
+        """Executes a command inside a running container and writes its output to a file
+        object while it is produced
+
+        stdout and stderr are written in the order they arrive. At most one chunk of the
+        output is held in memory.
+
+        :param string container_id: The id of the container
+        :param list cmd: The command and its arguments
+        :param file output: A writable binary file object
+        :param int chunk_size: The maximum size of a chunk in bytes
+        :return int: The exit code of the command
+        """
+
+        exec_id = self._createExec(container_id, cmd)
+        path = "/exec/{}/start".format(exec_id)
+
+        # the Docker daemon closes the connection after the output, so it is not pooled
+        connection = UnixHTTPConnection(self._socket_path, self._timeout)
+
+        try:
+            connection.request("POST", self._url(path), body=json.dumps({
+                "Detach": False,
+                "Tty": False
+            }).encode("utf-8"), headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+
+            if response.status >= 400:
+                self._raiseError("POST", path, response.status, response.read())
+
+            while True:
+                header = response.read(8)
+                if len(header) < 8:
+                    break
+
+                stream, length = struct.unpack(">BxxxL", header)
+
+                while length:
+                    data = response.read(min(length, chunk_size))
+                    if not data:
+                        break
+
+                    length -= len(data)
+
+                    if stream in (STREAM_STDOUT, STREAM_STDERR):
+                        output.write(data)
+
+                output.flush()
+        finally:
+            connection.close()
+
+        return self._json("GET", "/exec/{}/json".format(exec_id))["ExitCode"]
+
+    def putArchive(self, container_id, path, archive):
+        """Unpacks a tar archive inside a container
+
+        :param string container_id: The id of the container
+        :param string path: The directory where the archive should be unpacked
+        :param bytes|file archive: The archive or a readable file object which delivers it
+        """
+
+        self._request("PUT", "/containers/{}/archive".format(container_id),
+                      query={"path": path}, body=archive,
+                      headers={"Content-Type": "application/x-tar"})
+
+    def getArchive(self, container_id, path, fileobj=None, chunk_size=LOG_STREAM_CHUNK_SIZE):
+        """Returns a file or directory of a container as tar archive
+
+        If a file object is given, the archive is written into it while it is received and at
+        most one chunk of it is held in memory.
+
+        :param string container_id: The id of the container
+        :param string path: The path inside the container
+        :param file fileobj: A writable binary file object
+        :param int chunk_size: The maximum size of a chunk in bytes
+        :return bytes|None: The tar archive or None if it was written into 'fileobj'
+        """
+
+        api_path = "/containers/{}/archive".format(container_id)
+
+        if fileobj is None:
+            return self._request("GET", api_path, query={"path": path})
+
+        connection, response = self._send("GET", self._url(api_path, {"path": path}))
+
+        try:
+            if response.status >= 400:
+                self._raiseError("GET", api_path, response.status, response.read())
+
+            shutil.copyfileobj(response, fileobj, chunk_size)
+        except Exception:
+            connection.close()
+            raise
+
+        self._finish(connection, response)
+
+    def statPath(self, container_id, path):
+        """Returns information about a file or directory inside a container
+
+        :param string container_id: The id of the container
+        :param string path: The path inside the container
+        :return dict|None: With 'name', 'size' and 'mode' as keys or None if the path does
+                           not exist
+        """
+
+        try:
+            response = self._request("HEAD", "/containers/{}/archive".format(container_id),
+                                     query={"path": path}, response_headers=True)
+        except DockerAPIException as e:
+            if e.status == 404:
+                return None
+
+            raise
+
+        return json.loads(base64.b64decode(response["X-Docker-Container-Path-Stat"]).decode("utf-8"))
+
+    def close(self):
+        """Closes all idle connections
+        """
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection in idle:
+            connection.close()
+
+    @staticmethod
+    def demultiplex(data):
+        """Splits the multiplexed output of a command into stdout and stderr
+
+        Each frame starts with an 8 byte header: the stream type, three zero bytes and the
+        length of the payload as big-endian integer.
+
+        :param bytes data: The multiplexed output
+        :return dict: With 'stdout' and 'stderr' (both bytes) as keys
+        """
+
+        streams = {STREAM_STDOUT: [], STREAM_STDERR: []}
+        offset = 0
+
+        while offset + 8 <= len(data):
+            stream, length = struct.unpack(">BxxxL", data[offset:offset + 8])
+            offset += 8
+
+            if stream in streams:
+                streams[stream].append(data[offset:offset + length])
+
+            offset += length
+
+        return {"stdout": b"".join(streams[STREAM_STDOUT]),
+                "stderr": b"".join(streams[STREAM_STDERR])}
+
+    def _createExec(self, container_id, cmd):
+        """Creates an exec instance which attaches to stdout and stderr
+
+        :param string container_id: The id of the container
+        :param list cmd: The command and its arguments
+        :return string: The id of the exec instance
+        """
+
+        return self._json("POST", "/containers/{}/exec".format(container_id), body={
+            "Cmd": cmd,
+            "AttachStdout": True,
+            "AttachStderr": True
+        })["Id"]
+
+    def _url(self, path, query=None):
+        """Returns the versioned URL of an API path
+
+        :param string path: The API path (without version prefix)
+        :param dict query: The query parameters
+        :return string: The URL
+        """
+
+        url = "/v{}{}".format(DOCKER_API_VERSION, path)
+        if query:
+            url = "{}?{}".format(url, urlencode(query))
+
+        return url
+
+    def _raiseError(self, method, path, status, data):
+        """Raises a DockerAPIException for an error response
+
+        :param string method: The HTTP method
+        :param string path: The API path
+        :param int status: The HTTP status
+        :param bytes data: The response body
+        """
+
+        try:
+            message = json.loads(data.decode("utf-8"))["message"]
+        except (ValueError, KeyError):
+            message = data.decode("utf-8", "replace").strip()
+
+        raise DockerAPIException(method, path, status, message)
+
+    def _json(self, method, path, query=None, body=None):
+        """Sends a request and decodes the JSON response
+
+        :return dict: The decoded response
+        """
+
+        return json.loads(self._request(method, path, query, body).decode("utf-8"))
+
+    def _request(self, method, path, query=None, body=None, headers=None,
+                 response_headers=False):
+        """Sends a request over a pooled connection and reads the response
+
+        :param string method: The HTTP method
+        :param string path: The API path (without version prefix)
+        :param dict query: The query parameters
+        :param dict|bytes|file body: The request body - dictionaries are sent as JSON
+        :param dict headers: Additional request headers
+        :param bool response_headers: Returns the response headers instead of the body
+        :return bytes|HTTPMessage: The response body or the response headers
+        """
+
+        headers = dict(headers or {})
+        if isinstance(body, dict):
+            body = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        connection, response = self._send(method, self._url(path, query), body, headers)
+
+        try:
+            data = response.read()
+        except Exception:
+            connection.close()
+            raise
+
+        self._finish(connection, response)
+
+        if response.status >= 400:
+            self._raiseError(method, path, response.status, data)
+
+        if response_headers:
+            return response.headers
+
+        return data
+
+    def _send(self, method, url, body=None, headers=None):
+        """Sends a request over a pooled connection and returns the unread response
+
+        A GET or HEAD request on a reused connection is sent again on a new connection if
+        the Docker daemon has closed the reused connection in the meantime. Other requests
+        are never sent twice, because the Docker daemon might have processed them already.
+
+        :param string method: The HTTP method
+        :param string url: The versioned URL (@see _url())
+        :param bytes|file body: The request body
+        :param dict headers: The request headers
+        :return tuple: The connection and the response - the connection has to be given
+                       back with _finish() after the response was read
+        """
+
+        # only requests without side effects can be sent twice
+        retry = method in ("GET", "HEAD")
+
+        while True:
+            connection, reused = self._getConnection()
+
+            try:
+                connection.request(method, url, body=body, headers=headers or {})
+                return connection, connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+
+                if reused and retry:
+                    continue
+
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+    def _finish(self, connection, response):
+        """Gives the connection of a completely read response back to the pool
+
+        :param UnixHTTPConnection connection: The connection
+        :param http.client.HTTPResponse response: The response
+        """
+
+        # connections which were closed by the server (like after an exec) are not reused
+        if response.will_close:
+            connection.close()
+        else:
+            self._putConnection(connection)
+
+    def _getConnection(self):
+        """Takes an idle connection or opens a new one
+
+        :return tuple: The connection and if it was used before
+        """
+
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+
+                connection = self._idle.pop()
+
+            if not self._isClosed(connection):
+                return connection, True
+
+            connection.close()
+
+        return UnixHTTPConnection(self._socket_path, self._timeout), False
+
+    @staticmethod
+    def _isClosed(connection):
+        """Checks if the Docker daemon has closed an idle connection
+
+        An idle connection never has data to read - a readable socket means that the
+        connection was closed by the Docker daemon.
+
+        :param UnixHTTPConnection connection: The idle connection
+        :return bool: True if the connection can't be used anymore
+        """
+
+        if connection.sock is None:
+            return True
+
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+
+        return bool(readable)
+
+    def _putConnection(self, connection):
+        """Gives a connection back to the pool
+
+        :param UnixHTTPConnection connection: The connection
+        """
+
+        with self._lock:
+            if len(self._idle) < self._pool_size:
+                self._idle.append(connection)
+                return
+
+        connection.close()
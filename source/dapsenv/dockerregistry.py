@@ -18,10 +18,20 @@
 
 import shlex
 import subprocess
-from dapsenv.exceptions import DockerRegisteryException
+from dapsenv.exceptions import DockerRegisteryException, DockerAPIException
 
 
-def is_image_imported(imagename):
+def is_image_imported(imagename, client=None):
+    """Checks if a Docker image is available
+
+    :param string imagename: The name of the image
+    :param DockerClient client: Asks the Docker Engine API instead of the docker CLI
+    :return bool: True if the image is available
+    """
+
+    if client:
+        return client.imageExists(imagename)
+
     with open("/dev/null", "r") as devnull:
         process = subprocess.Popen(
             shlex.split("docker images -q {}".format(imagename)),
@@ -39,3 +49,39 @@ def is_image_imported(imagename):
             return True
 
     return False
+
+
+def get_image_id(imagename, client=None):
+    """Returns the id of a Docker image - the id changes whenever the image gets updated
+
+    :param string imagename: The name of the image
+    :param DockerClient client: Asks the Docker Engine API instead of the docker CLI
+    :return string|None: The id or None if the image is not available
+    """
+
+    if client:
+        try:
+            return client.inspectImage(imagename)["Id"]
+        except DockerAPIException as e:
+            if e.status == 404:
+                return None
+
+            raise
+
+    # the id of exactly the image 'docker run' uses for this name
+    process = subprocess.Popen(
+        ["docker", "image", "inspect", "--format", "{{.Id}}", imagename],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    stdout, stderr = process.communicate()
+    stderr = stderr.decode("utf-8")
+
+    if process.returncode:
+        if "No such image" in stderr:
+            return None
+
+        raise DockerRegisteryException(stderr)
+
+    return stdout.decode("utf-8").strip() or None
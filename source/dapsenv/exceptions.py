@@ -118,6 +118,15 @@ class ContainerBuildFileNotAvailableException(DapsEnvException):
     pass
 
 
+class JobLogNotFoundException(DapsEnvException):
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.message = "No log found for job {}.".format(job_id)
+
+    def __str__(self):
+        return self.message
+
+
 class UnexpectedStderrOutputException(DapsEnvException):
     def __init__(self, command, stderr):
         self.command = command
@@ -157,6 +166,39 @@ class GitErrorException(DapsEnvException):
         log.error("Could not execute %r: %s", self.command, self.stderr)
 
 
+class GitTimeoutException(DapsEnvException):
+    def __init__(self, command, timeout):
+        self.command = command
+        self.timeout = timeout
+        self.message = "Command '{}' did not finish within {} seconds.".format(command, timeout)
+
+    def __str__(self):
+        return self.message
+
+
+class ContainerPreparationFailedException(DapsEnvException):
+    def __init__(self, command, stderr):
+        self.command = command
+        self.stderr = stderr
+        self.message = "Could not prepare the container - '{}' failed: {}".format(command, stderr)
+
+    def __str__(self):
+        return self.message
+
+
+class SnapshotExportException(DapsEnvException):
+    def __init__(self, commit, command, stderr):
+        self.commit = commit
+        self.command = command
+        self.stderr = stderr
+        self.message = "Could not export commit {} - '{}' failed: {}".format(
+            commit, command, stderr
+        )
+
+    def __str__(self):
+        return self.message
+
+
 class ContainerFileCreationFailed(DapsEnvException):
     def __init__(self, file_name):
         self.file_name = file_name
@@ -281,3 +323,25 @@ class APIUnauthorizedTokenException(DapsEnvException):
 class APIErrorException(DapsEnvException):
     def __init__(self, message):
         self.message = message
+
+
+class JobNotFoundException(DapsEnvException):
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.message = "Job '{}' is not known to the daemon.".format(job_id)
+
+    def __str__(self):
+        return self.message
+
+
+class DockerAPIException(DapsEnvException):
+    def __init__(self, method, path, status, message):
+        self.method = method
+        self.path = path
+        self.status = status
+        self.message = "Docker API request '{} {}' failed ({}): {}".format(
+            method, path, status, message
+        )
+
+    def __str__(self):
+        return self.message
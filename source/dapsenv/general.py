@@ -28,12 +28,63 @@ DAEMON_DEFAULT_INTERVAL = 300
 # max docker containers default value
 DAEMON_DEFAULT_MAX_CONTAINERS = 15
 
+# how many idle build containers the daemon keeps ready
+DAEMON_DEFAULT_CONTAINER_POOL_MIN = 2
+
+# how many idle build containers the daemon keeps at most
+DAEMON_DEFAULT_CONTAINER_POOL_MAX = 5
+
+# after how many builds a build container gets replaced by a fresh one
+DAEMON_DEFAULT_CONTAINER_MAX_BUILDS = 20
+
+# the formats the daemon builds of each DC file
+BUILD_FORMATS = ["html", "single_html", "pdf"]
+
+# the order in which the formats of DC files are built (comma separated)
+DAEMON_DEFAULT_FORMAT_PRIORITY = "html,single_html,pdf"
+
+# how many repositories the daemon updates in parallel
+DAEMON_DEFAULT_POLL_WORKERS = 8
+
+# seconds a single repository update may take before it gets aborted
+DAEMON_DEFAULT_POLL_TIMEOUT = 600
+
+# days a log file is kept (0 keeps log files forever)
+DAEMON_DEFAULT_LOG_MAX_AGE = 30
+
+# megabytes all log files may take together (0 means no limit)
+DAEMON_DEFAULT_LOG_MAX_SIZE = 512
+
 # the directory where a repository should be copied in a container
 CONTAINER_REPO_DIR = "/tmp/build"
 
+# the directory where commit snapshots are mounted in a container (read-only)
+CONTAINER_SNAPSHOTS_DIR = "/tmp/snapshots"
+
+# the directory where DAPS writes its output when a snapshot is built
+CONTAINER_SCRATCH_DIR = "/tmp/scratch"
+
+# the directory where build.sh writes the results of a build
+CONTAINER_RESULT_DIR = "/tmp/result"
+
 # the name of the docker image
 CONTAINER_IMAGE = "mschnitzer/dapsenv"
 
+# the unix domain socket of the Docker daemon
+DOCKER_SOCKET_PATH = "/var/run/docker.sock"
+
+# the Docker Engine API version which is requested
+DOCKER_API_VERSION = "1.24"
+
+# how many idle connections to the Docker daemon are kept open
+DOCKER_API_POOL_SIZE = 8
+
+# size of the chunks in which the output of a build is written to its log file
+LOG_STREAM_CHUNK_SIZE = 64 * 1024
+
+# seconds between two reads of the log of a running job while it is followed
+LIVE_LOG_POLL_INTERVAL = 1
+
 # source directory of this python project
 SOURCE_DIR = path.dirname(path.realpath(__file__))
 
@@ -43,12 +94,27 @@ HOME_DIR = "{}/.dapsenv".format(path.expanduser("~"))
 # error log directory
 LOG_DIR = "{}/logs".format(HOME_DIR)
 
+# logs of running builds - one file per job, removed when the job is finished
+RUNNING_LOG_DIR = "{}/running".format(LOG_DIR)
+
 # tmp directory
 TMP_DIR = "{}/tmp".format(HOME_DIR)
 
 # tmp directory
 BUILDS_DIR = "{}/builds".format(HOME_DIR)
 
+# managed git worktrees - one per repository and branch
+WORKTREES_DIR = "{}/worktrees".format(HOME_DIR)
+
+# read-only exports of built commits - one directory per commit hash
+SNAPSHOTS_DIR = "{}/snapshots".format(HOME_DIR)
+
+# cache for the used files of DC files
+DEPENDENCY_CACHE_PATH = "{}/dependency-cache.json".format(HOME_DIR)
+
+# remembers which build archive was created from which inputs
+BUILD_CACHE_PATH = "{}/build-cache.json".format(HOME_DIR)
+
 # templates location
 TEMPLATE_PATH = "{}/templates".format(SOURCE_DIR)
 
@@ -66,3 +132,6 @@ TOKEN_LENGTH = 32
 
 # token validation pattern
 TOKEN_PATTERN = re.compile("^[a-zA-Z0-9]+$")
+
+# how many finished jobs the daemon keeps in its job registry
+JOB_REGISTRY_FINISHED_LIMIT = 100
@@ -16,10 +16,15 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import hashlib
+import os
 import shlex
 import subprocess
+import threading
+import time
 from dapsenv.exceptions import (GitInvalidRepoException, GitInvalidBranchName,
-                                GitErrorException)
+                                GitErrorException, GitTimeoutException)
+from dapsenv.general import WORKTREES_DIR
 import logging
 log = logging.getLogger(__name__)
 
@@ -32,109 +37,175 @@ class Repository:
         """
 
         self._repopath = repo
+        self._git_dir = None
+        self._remotes = {}
 
         if not self._isGitRepo():
             raise GitInvalidRepoException(repo)
 
-    def checkout(self, branch):
-        """Checks out the given branch
-        """
-
-        process = subprocess.Popen(
-            shlex.split("git -C {} checkout {}".format(self.getRepoPath(), branch)),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-
-        if "did not match any" in process.stderr.read().decode("utf-8"):
-            raise GitInvalidBranchName(self.getRepoPath(), branch)
+        self._objects = ObjectReader(repo)
 
     def branch(self):
         """Returns the name of the current branch
 
-        :return string: Branch-Name
+        :return string: Branch-Name or 'HEAD' if no branch is checked out
         """
 
-        process = subprocess.Popen(
-            shlex.split("git -C {} rev-parse --abbrev-ref HEAD".format(self.getRepoPath())),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+        with open(os.path.join(self._git_dir, "HEAD"), "r") as head:
+            ref = head.read().strip()
+
+        if ref.startswith("ref: refs/heads/"):
+            return ref[len("ref: refs/heads/"):]
 
-        return process.stdout.read().decode("utf-8")[:-1]
+        return "HEAD"
 
-    def pull(self, branch, force=False):
-        """Pulls new commits from the git server
+    def update(self, branch, deadline=None):
+        """Brings a branch up to date with its remote branch and returns its last commit hash
+
+        The tip of the remote branch is looked up with 'git ls-remote' first. Only if it
+        differs from the local branch, the new commits are fetched and the branch is moved to
+        the remote tip - also if the remote branch was rewritten. Only the branch is moved,
+        the working tree of the repository is left alone even if the branch is checked out
+        there (builds use the managed worktrees, @see worktree()).
 
         :param string branch: The branch which should be updated
-        :param bool force: Forces the pull
+        :param float deadline: Point in time (@see time.time()) when all git commands of the
+                               update have to be finished
+        :return string: The last commit hash of the branch after the update
         """
 
-        options = ""
-        if force:
-            options = " --force"
+        remote = self._getRemote(branch, deadline)
+        local_tip = self.getLastCommitHash(branch)
 
-        # switch to the specified branch to update it
-        self.checkout(branch)
+        cmd = "git -C {} ls-remote {} refs/heads/{}".format(self.getRepoPath(), remote, branch)
+        stdout, stderr = self._run(cmd, deadline, check=True)
 
-        # perform 'pull' on branch
-        with open("/dev/null", "w") as devnull:
-            cmd = "git -C {} pull{}".format(self.getRepoPath(), options)
+        if not stdout:
+            raise GitErrorException(cmd, "Branch '{}' does not exist on remote '{}'.".format(
+                branch, remote
+            ))
 
-            subprocess.Popen(
-                shlex.split(cmd),
-                stdout=devnull,
-                stderr=devnull
-            )
+        if stdout.split()[0] == local_tip:
+            return local_tip
+
+        self._fetchBranch(branch, remote, deadline)
+
+        return self.getLastCommitHash(branch)
+
+    def worktree(self, branch, deadline=None):
+        """Returns the path of the managed worktree of a branch
+
+        Each branch of a repository gets its own detached worktree below the dapsenv home
+        directory, so that branches never need to be checked out in the repository itself.
+        A missing worktree gets created, an existing one is moved to the tip of the branch.
+        A branch which exists only on the remote gets fetched first.
+
+        :param string branch: The branch
+        :param float deadline: Point in time (@see time.time()) when git has to be finished
+        :return string: The path of the worktree
+        """
+
+        path = self._getWorktreePath(branch)
+
+        if self._objects.read("refs/heads/{}".format(branch)) is None:
+            self._fetchBranch(branch, self._getRemote(branch, deadline), deadline)
+
+        commit = self.getLastCommitHash(branch)
+
+        if not os.path.isdir(path):
+            # forget worktrees whose directories have been removed
+            self._run("git -C {} worktree prune".format(self.getRepoPath()), deadline)
+            self._run("git -C {} worktree add --detach {} {}".format(
+                self.getRepoPath(), path, commit
+            ), deadline, check=True)
+        else:
+            self.updateWorktree(branch, commit, deadline)
+
+        return path
+
+    def updateWorktree(self, branch, commit, deadline=None):
+        """Moves the managed worktree of a branch to a commit
+
+        :param string branch: The branch
+        :param string commit: The commit which should be checked out in the worktree
+        :param float deadline: Point in time (@see time.time()) when git has to be finished
+        """
+
+        path = self._getWorktreePath(branch)
+
+        if self._getWorktreeHead(path) != commit:
+            self._run("git -C {} checkout -q --force --detach {}".format(path, commit),
+                      deadline, check=True)
 
     def getLastCommitHash(self, branch):
         """Fetches the last commit hash of a branch
 
         :param string branch: Name of the branch
+        :return string: The commit hash
         """
 
-        cmd = "git --no-pager -C {} log -n 1 --pretty=format:\"%H\" {}".format(
-            self.getRepoPath(), branch
-        )
+        obj = self._objects.read("{}^{{commit}}".format(branch))
 
-        process = subprocess.Popen(
-            shlex.split(cmd),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-
-        if "path not in the" in process.stderr.read().decode("utf-8"):
+        if obj is None:
             raise GitInvalidBranchName(self.getRepoPath(), branch)
 
-        return process.stdout.read().decode("utf-8")
+        return obj[0]
 
     def getChangedFilesBetweenCommits(self, commit_1, commit_2):
         """Returns a list of changed files between two commits
 
+        The trees of both commits are compared with each other, so that only directories
+        with different tree objects need to be read.
+
         :param string commit_1: Oldest Commit
         :param string commit_2: Newest Commit
         :return list: Changed files
         """
 
-        cmd = "git --no-pager -C {} diff --name-only {} {}".format(
-            self._repopath,
-            commit_1,
-            commit_2
-        )
+        return self._diffTrees(self._getTree(commit_1), self._getTree(commit_2))
 
-        process = subprocess.Popen(
-            shlex.split(cmd),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+    def getFileContent(self, rev, path):
+        """Returns the content of a file at a revision without touching any working tree
+
+        :param string rev: A commit or a branch
+        :param string path: The path of the file inside the repository
+        :return string: The content of the file
+        """
+
+        obj = self._objects.read("{}:{}".format(rev, path))
+
+        if obj is None or obj[1] != "blob":
+            raise GitErrorException("git cat-file --batch", "File '{}' does not exist in '{}'.".format(
+                path, rev
+            ))
 
-        stdout = process.stdout.read().decode("utf-8")
-        stderr = process.stderr.read().decode("utf-8")
+        return obj[2].decode("utf-8")
 
-        if stderr:
-            raise GitErrorException(cmd, stderr)
+    def getObjectIDs(self, rev, paths):
+        """Returns the object hashes of files or directories at a revision
 
-        return list(filter(None, stdout.split("\n")))
+        :param string rev: A commit or a branch
+        :param iterable paths: Paths inside the repository - an empty path stands for the
+                               root directory
+        :return dict: The paths as keys and their hashes (or None if a path does not exist)
+                      as values
+        """
+
+        known = {"": ("40000", self._getTree(rev))}
+        entries = {}
+        ids = {}
+
+        for path in paths:
+            entry = self._getTreeEntry(path.strip("/"), known, entries)
+            ids[path] = entry[1] if entry else None
+
+        return ids
+
+    def close(self):
+        """Stops the git process which reads the objects of the repository
+        """
+
+        self._objects.close()
 
     def getRepoPath(self):
         """Gets the full path to the repository which was specified in __init__
@@ -144,20 +215,285 @@ class Repository:
 
         return self._repopath
 
-    def _isGitRepo(self):
-        """Checks if the specified directory is a git repository
+    def _run(self, cmd, deadline=None, check=False):
+        """Runs a git command and waits until it has finished
 
-        :return bool: true = is a git repository | false = is not a git repository
+        :param string cmd: The command
+        :param float deadline: Point in time (@see time.time()) when the command gets killed
+        :param bool check: Raise a GitErrorException if the command fails
+        :return tuple: stdout and stderr of the command
         """
 
-        cmd = "git -C {} rev-parse --git-dir".format(self._repopath)
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.time()
+
+            if timeout <= 0:
+                raise GitTimeoutException(cmd, 0)
+
         process = subprocess.Popen(
             shlex.split(cmd),
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE
         )
 
-        if len(process.stderr.read().decode("utf-8")):
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+
+            raise GitTimeoutException(cmd, round(timeout))
+
+        if check and process.returncode:
+            raise GitErrorException(cmd, stderr.decode("utf-8"))
+
+        return stdout.decode("utf-8"), stderr.decode("utf-8")
+
+    def _getRemote(self, branch, deadline=None):
+        """Returns the name of the remote a branch is tracking
+
+        :param string branch: The branch
+        :param float deadline: Point in time (@see time.time()) when git has to be finished
+        :return string: The name of the remote - 'origin' if the branch has no upstream
+        """
+
+        if branch not in self._remotes:
+            stdout, stderr = self._run("git -C {} config branch.{}.remote".format(
+                self.getRepoPath(), branch
+            ), deadline)
+
+            self._remotes[branch] = stdout.strip() or "origin"
+
+        return self._remotes[branch]
+
+    def _fetchBranch(self, branch, remote, deadline=None):
+        """Fetches a branch and moves (or creates) the local branch to the remote tip
+
+        :param string branch: The branch
+        :param string remote: The remote of the branch
+        :param float deadline: Point in time (@see time.time()) when git has to be finished
+        """
+
+        self._run("git -C {} fetch --update-head-ok {} +{}:{}".format(
+            self.getRepoPath(), remote, branch, branch
+        ), deadline, check=True)
+
+    def _getWorktreePath(self, branch):
+        """Returns the path of the managed worktree of a branch
+
+        :param string branch: The branch
+        :return string: The path - the last directory has the name of the repository
+        """
+
+        repopath = os.path.realpath(self.getRepoPath())
+
+        return os.path.join(
+            WORKTREES_DIR,
+            "{}-{}".format(hashlib.sha1(repopath.encode("utf-8")).hexdigest()[:12],
+                           branch.replace("/", "_")),
+            os.path.basename(repopath)
+        )
+
+    def _getWorktreeHead(self, path):
+        """Returns the commit a detached worktree is at
+
+        :param string path: The path of the worktree
+        :return string|None: The commit hash or None if it can't be determined
+        """
+
+        try:
+            # the .git file of a worktree points to its own git directory
+            with open(os.path.join(path, ".git"), "r") as git_file:
+                git_dir = git_file.read().strip()[len("gitdir: "):]
+
+            with open(os.path.join(path, git_dir, "HEAD"), "r") as head:
+                return head.read().strip()
+        except IOError:
+            return None
+
+    def _getTree(self, commit):
+        """Returns the tree hash of a commit
+
+        :param string commit: The commit
+        :return string: The tree hash
+        """
+
+        obj = self._objects.read("{}^{{commit}}".format(commit))
+
+        if obj is None:
+            raise GitErrorException("git cat-file --batch", "Invalid commit '{}'.".format(commit))
+
+        # the first line of a commit object is 'tree <hash>'
+        return obj[2].split(b"\n", 1)[0].split()[1].decode("ascii")
+
+    def _getTreeEntry(self, path, known, entries):
+        """Looks up a path by walking down the trees
+
+        :param string path: The path inside the repository
+        :param dict known: Already resolved paths and their tree entries
+        :param dict entries: Already read trees by their path
+        :return tuple|None: The mode and the hash of the path or None if it does not exist
+        """
+
+        if path in known:
+            return known[path]
+
+        parent, _, name = path.rpartition("/")
+        parent_entry = self._getTreeEntry(parent, known, entries)
+        entry = None
+
+        if parent_entry and parent_entry[0] == "40000":
+            if parent not in entries:
+                entries[parent] = self._readTree(parent_entry[1])
+
+            entry = entries[parent].get(name)
+
+        known[path] = entry
+
+        return entry
+
+    def _readTree(self, tree):
+        """Reads the entries of a tree object
+
+        :param string tree: The tree hash
+        :return dict: The entries - the name as key and a tuple of mode and hash as value
+        """
+
+        obj = self._objects.read(tree)
+
+        if obj is None or obj[1] != "tree":
+            raise GitErrorException("git cat-file --batch", "Invalid tree '{}'.".format(tree))
+
+        sha, obj_type, data = obj
+        hash_len = len(sha) // 2
+        entries = {}
+
+        # an entry consists of '<mode> <name>\0' followed by the binary hash
+        pos = 0
+        while pos < len(data):
+            end = data.index(b"\0", pos)
+            mode, name = data[pos:end].decode("utf-8").split(" ", 1)
+            entries[name] = (mode, data[end + 1:end + 1 + hash_len].hex())
+            pos = end + 1 + hash_len
+
+        return entries
+
+    def _diffTrees(self, tree_1, tree_2, prefix=""):
+        """Returns all paths which differ between two trees
+
+        :param string tree_1: The old tree hash or None
+        :param string tree_2: The new tree hash or None
+        :param string prefix: The path of the trees inside the repository
+        :return list: Changed files
+        """
+
+        entries_1 = self._readTree(tree_1) if tree_1 else {}
+        entries_2 = self._readTree(tree_2) if tree_2 else {}
+        changed_files = []
+
+        for name in sorted(set(entries_1).union(entries_2)):
+            entry_1 = entries_1.get(name)
+            entry_2 = entries_2.get(name)
+
+            if entry_1 == entry_2:
+                continue
+
+            path = "{}{}".format(prefix, name)
+            subtree_1 = entry_1[1] if entry_1 and entry_1[0] == "40000" else None
+            subtree_2 = entry_2[1] if entry_2 and entry_2[0] == "40000" else None
+
+            # a file on one side which is not a directory on the other side has changed
+            if (entry_1 and not subtree_1) or (entry_2 and not subtree_2):
+                changed_files.append(path)
+
+            if subtree_1 or subtree_2:
+                changed_files.extend(self._diffTrees(subtree_1, subtree_2, "{}/".format(path)))
+
+        return changed_files
+
+    def _isGitRepo(self):
+        """Checks if the specified directory is a git repository and remembers its git directory
+
+        :return bool: true = is a git repository | false = is not a git repository
+        """
+
+        cmd = "git -C {} rev-parse --git-dir".format(self._repopath)
+        stdout, stderr = self._run(cmd)
+
+        if len(stderr):
             return False
 
+        self._git_dir = os.path.join(self._repopath, stdout.strip())
+
         return True
+
+
+class ObjectReader:
+    """Reads objects of a repository through one long-lived 'git cat-file --batch' process
+    """
+
+    def __init__(self, repo):
+        """Initializes the ObjectReader class
+
+        :param string repo: The path to the repository
+        """
+
+        self._repopath = repo
+        self._process = None
+        self._lock = threading.Lock()
+
+    def read(self, rev):
+        """Reads an object
+
+        :param string rev: A revision expression (like a hash, a branch or '<rev>:<path>')
+        :return tuple|None: The hash, the type and the content (bytes) of the object or None
+                            if the object does not exist
+        """
+
+        with self._lock:
+            process = self._getProcess()
+
+            process.stdin.write("{}\n".format(rev).encode("utf-8"))
+            process.stdin.flush()
+
+            header = process.stdout.readline().decode("utf-8").split()
+
+            if not header:
+                self.close()
+                raise GitErrorException("git cat-file --batch", "Unexpected end of output.")
+
+            # the header is '<hash> <type> <size>' or '<rev> missing' - the revision might
+            # contain spaces
+            if header[-1] in ("missing", "ambiguous"):
+                return None
+
+            sha, obj_type, size = header
+            data = process.stdout.read(int(size) + 1)[:-1]
+
+            return sha, obj_type, data
+
+    def close(self):
+        """Stops the git process
+        """
+
+        if self._process:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+    def _getProcess(self):
+        """Returns the git process and (re)starts it, if required
+
+        :return subprocess.Popen: The process
+        """
+
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "-C", self._repopath, "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+
+        return self._process
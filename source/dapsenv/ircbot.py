@@ -21,6 +21,7 @@ import irc.connection
 import irc.schedule
 import irc.strings
 import ssl
+from dapsenv.jobregistry import JOB_FINISHED
 
 
 class IRCBot(irc.bot.SingleServerIRCBot):
@@ -88,7 +89,7 @@ class IRCBot(irc.bot.SingleServerIRCBot):
 
             active_builds = []
             for builds in status["jobs"]:
-                active_builds.append(builds["dc_file"])
+                active_builds.append("{} (Job-ID: {})".format(builds["dc_file"], builds["id"]))
 
             if active_builds:
                 c.privmsg(e.source.nick, "Active Builds: {}".format(", ".join(active_builds)))
@@ -96,11 +97,10 @@ class IRCBot(irc.bot.SingleServerIRCBot):
             if not args:
                 c.privmsg(e.source.nick, "Syntax: buildinfo [DC-File]")
             else:
-                status = self._daemon.getStatus()
                 dc_file = args[0]
 
-                for job in status["jobs"]:
-                    if job["dc_file"] == dc_file:
+                for job in self._daemon.getJobsByDCFile(dc_file):
+                    if job["status"] != JOB_FINISHED:
                         started_info = "No"
                         container_id = "Unknown"
 
@@ -110,10 +110,13 @@ class IRCBot(irc.bot.SingleServerIRCBot):
                             if job["container_id"]:
                                 container_id = job["container_id"]
 
-                        c.privmsg(e.source.nick, "Build started? {}, Container-ID: {}".format(
+                        message = "Job-ID: {}, Build started? {}, Container-ID: {}".format(
+                            job["id"],
                             started_info,
                             container_id
-                        ))
+                        )
+
+                        c.privmsg(e.source.nick, message)
 
                         return
 
@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import glob
+import gzip
+import os
+import shutil
+from dapsenv.exceptions import JobLogNotFoundException
+from dapsenv.general import LOG_DIR, RUNNING_LOG_DIR, LOG_STREAM_CHUNK_SIZE
+
+
+def get_running_log_path(job_id):
+    """Returns the path to the log file of a running job
+
+    :param int job_id: The id of the job
+    :return string: The path to the log file
+    """
+
+    return "{}/{}.log".format(RUNNING_LOG_DIR, job_id)
+
+
+def get_finished_log_path(job_id):
+    """Returns the path to the gzip compressed log file of a finished job
+
+    :param int job_id: The id of the job
+    :return string: The path to the log file
+    """
+
+    return "{}/job_{}.log.gz".format(LOG_DIR, job_id)
+
+
+def finish_job_log(job_id):
+    """Compresses the log file of a job which has been finished - the byte offsets refer to
+    the uncompressed log and stay valid
+
+    :param int job_id: The id of the job
+    """
+
+    running_path = get_running_log_path(job_id)
+    finished_path = get_finished_log_path(job_id)
+    tmp_path = "{}.tmp".format(finished_path)
+
+    try:
+        with open(running_path, "rb") as source:
+            with gzip.open(tmp_path, "wb") as target:
+                shutil.copyfileobj(source, target, LOG_STREAM_CHUNK_SIZE)
+    except FileNotFoundError:
+        return
+
+    # the compressed log exists before the running log disappears, so that clients which
+    # follow the log never miss it
+    os.replace(tmp_path, finished_path)
+    os.remove(running_path)
+
+
+def remove_job_logs():
+    """Removes the log files of all jobs - job ids start at 1 again when the daemon starts
+    """
+
+    paths = glob.glob(get_running_log_path("*")) + glob.glob(get_finished_log_path("*"))
+
+    # uncompressed logs of earlier versions
+    paths += glob.glob("{}/job_*.log".format(LOG_DIR))
+
+    for path in paths:
+        os.remove(path)
+
+
+def read_job_log(job_id, offset, size=LOG_STREAM_CHUNK_SIZE):
+    """Reads a chunk of the log of a running or finished job
+
+    :param int job_id: The id of the job
+    :param int offset: The byte offset where the chunk starts
+    :param int size: The maximum size of the chunk
+    :return tuple: The chunk (bytes) and if the job is still running
+    """
+
+    # a finished job compresses its log file, so the running log is checked first
+    for path, running, opener in ((get_running_log_path(job_id), True, open),
+                                  (get_finished_log_path(job_id), False, gzip.open)):
+        try:
+            with opener(path, "rb") as log_file:
+                log_file.seek(offset)
+                return log_file.read(size), running
+        except FileNotFoundError:
+            continue
+
+    raise JobLogNotFoundException(job_id)
@@ -0,0 +1,231 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import heapq
+import time
+from collections import OrderedDict
+from dapsenv.exceptions import JobNotFoundException
+from dapsenv.general import JOB_REGISTRY_FINISHED_LIMIT
+
+# job states
+JOB_PENDING = 0
+JOB_RUNNING = 1
+JOB_FINISHED = 2
+
+
+class JobRegistry:
+    """Keeps track of all build jobs of the daemon
+
+    Every job gets a unique id. Jobs are indexed by their id and by their DC file and are
+    stored in separate collections for pending, running and finished jobs, so that all
+    lookups and state changes take constant time.
+
+    There is at most one pending job per project, DC file and formats. Scheduling the same
+    DC file again while a job is still pending only updates the commit of the pending job. A
+    running job can therefore get one follow-up job, but never a pile of duplicates.
+
+    Pending jobs are started by their priority (lower values first), jobs with the same
+    priority in the order they were added.
+
+    The registry is not thread-safe on its own - the caller has to hold a lock.
+    """
+
+    def __init__(self, finished_limit=JOB_REGISTRY_FINISHED_LIMIT):
+        """Initializes the JobRegistry class
+
+        :param int finished_limit: How many finished jobs should be remembered
+        """
+
+        self._next_id = 1
+        self._finished_limit = finished_limit
+
+        self._jobs = {}
+        self._dc_files = {}
+
+        self._pending = OrderedDict()
+        self._pending_keys = {}
+        self._pending_queue = []
+        self._running = OrderedDict()
+        self._finished = OrderedDict()
+
+    def add(self, project, dc_file, commit, formats=(), priority=0):
+        """Adds a new pending job or merges it into an already pending one
+
+        :param dict project: The project the DC file belongs to
+        :param string dc_file: The name of the DC file
+        :param string commit: The commit hash what should get built
+        :param list formats: The formats what should get built
+        :param int priority: The priority of the job - lower values are started first
+        :return dict: The new or the updated pending job
+        """
+
+        key = self._key(project, dc_file, formats)
+
+        # keep only the newest commit of an already pending job
+        if key in self._pending_keys:
+            job = self._pending_keys[key]
+            job["project"] = project
+            job["commit"] = commit
+
+            return job
+
+        job = {
+            "id": self._next_id,
+            "project": project,
+            "dc_file": dc_file,
+            "commit": commit,
+            "formats": list(formats),
+            "priority": priority,
+            "status": JOB_PENDING,
+            "container_id": "",
+            "time_started": 0,
+            "time_finished": 0
+        }
+
+        self._next_id += 1
+
+        self._jobs[job["id"]] = job
+        self._dc_files.setdefault(dc_file, OrderedDict())[job["id"]] = job
+        self._pending[job["id"]] = job
+        self._pending_keys[key] = job
+        heapq.heappush(self._pending_queue, (priority, job["id"]))
+
+        return job
+
+    def get(self, job_id):
+        """Returns a job by its id
+
+        :param int job_id: The id of the job
+        :return dict: The job
+        """
+
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise JobNotFoundException(job_id)
+
+    def getByDCFile(self, dc_file):
+        """Returns all known jobs of a DC file
+
+        :param string dc_file: The name of the DC file
+        :return list: A list of jobs, ordered by their id
+        """
+
+        return list(self._dc_files.get(dc_file, {}).values())
+
+    def nextPending(self):
+        """Returns the pending job with the highest priority
+
+        :return dict|None: The job or None if no job is pending
+        """
+
+        # drop queue entries of jobs which are already started
+        while self._pending_queue and self._pending_queue[0][1] not in self._pending:
+            heapq.heappop(self._pending_queue)
+
+        if not self._pending_queue:
+            return None
+
+        return self._pending[self._pending_queue[0][1]]
+
+    def start(self, job_id):
+        """Marks a pending job as running
+
+        :param int job_id: The id of the job
+        :return dict: The job
+        """
+
+        job = self.get(job_id)
+
+        del self._pending[job_id]
+        del self._pending_keys[self._key(job["project"], job["dc_file"], job["formats"])]
+        self._running[job_id] = job
+
+        job["status"] = JOB_RUNNING
+        job["time_started"] = int(time.time())
+
+        return job
+
+    def finish(self, job_id):
+        """Marks a running job as finished
+
+        :param int job_id: The id of the job
+        :return dict: The job
+        """
+
+        job = self.get(job_id)
+
+        del self._running[job_id]
+        self._finished[job_id] = job
+
+        job["status"] = JOB_FINISHED
+        job["time_finished"] = int(time.time())
+
+        # forget the oldest finished jobs
+        while len(self._finished) > self._finished_limit:
+            old_id, old_job = self._finished.popitem(last=False)
+            self._forget(old_job)
+
+        return job
+
+    def setContainerID(self, job_id, container_id):
+        """Saves the container id of a running job
+
+        :param int job_id: The id of the job
+        :param string container_id: The Docker container id
+        """
+
+        self.get(job_id)["container_id"] = container_id
+
+    def jobs(self):
+        """Returns all running and pending jobs
+
+        :return list: Running jobs first, then pending jobs
+        """
+
+        return list(self._running.values()) + list(self._pending.values())
+
+    @property
+    def pendingCount(self):
+        return len(self._pending)
+
+    @property
+    def runningCount(self):
+        return len(self._running)
+
+    def _key(self, project, dc_file, formats):
+        """Returns the key which identifies equal pending jobs
+
+        :return tuple: The key
+        """
+
+        return (project["project"], dc_file, tuple(formats))
+
+    def _forget(self, job):
+        """Removes a job from all indexes
+
+        :param dict job: The job
+        """
+
+        del self._jobs[job["id"]]
+
+        dc_jobs = self._dc_files[job["dc_file"]]
+        del dc_jobs[job["id"]]
+
+        if not dc_jobs:
+            del self._dc_files[job["dc_file"]]
@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import os
+import time
+
+import logging
+log = logging.getLogger(__name__)
+
+
+def prune_logs(log_dir, max_age=0, max_size=0, now=None):
+    """Removes old log files until the remaining ones are within the limits
+
+    Log files which are older than max_age are removed first. If the remaining log files
+    are larger than max_size together, the oldest ones are removed. Sub directories (like
+    the logs of running builds) and temporary files (*.tmp) which are still being written
+    are not touched. Removing a log which is being sent does not disturb the reader.
+
+    :param string log_dir: The log directory
+    :param int max_age: The maximum age of a log file in seconds (0 means no limit)
+    :param int max_size: The maximum size of all log files in bytes (0 means no limit)
+    :param float now: The current time (defaults to time.time())
+    :return int: The amount of removed log files
+    """
+
+    if now is None:
+        now = time.time()
+
+    logs = []
+    for entry in os.scandir(log_dir):
+        if entry.name.endswith(".tmp") or not entry.is_file(follow_symlinks=False):
+            continue
+
+        stat = entry.stat(follow_symlinks=False)
+        logs.append((stat.st_mtime, stat.st_size, entry.path))
+
+    # oldest first
+    logs.sort()
+
+    total_size = sum(size for mtime, size, path in logs)
+    removed = 0
+
+    for mtime, size, path in logs:
+        too_old = max_age and now - mtime > max_age
+        too_large = max_size and total_size > max_size
+
+        if not too_old and not too_large:
+            break
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+        total_size -= size
+        removed += 1
+
+    if removed:
+        log.debug("%d log files removed from %r", removed, log_dir)
+
+    return removed
+
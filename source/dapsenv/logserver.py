@@ -16,49 +16,352 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import gzip
 import os
 import re
-from dapsenv.general import LOG_DIR
-from http.server import BaseHTTPRequestHandler
+import shutil
+import threading
+import time
+from dapsenv.exceptions import JobLogNotFoundException
+from dapsenv.general import LOG_DIR, LIVE_LOG_POLL_INTERVAL, LOG_STREAM_CHUNK_SIZE
+from dapsenv.joblog import read_job_log
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from stat import S_ISREG
 
 _logs_pattern = re.compile("^\/logs\/([a-zA-Z0-9\_\-]+)$")
+_live_pattern = re.compile("^\/live\/([0-9]+)(?:\?offset=([0-9]+))?$")
+_range_pattern = re.compile("^bytes=([0-9]*)-([0-9]*)$")
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """Handles every request in its own thread, so that clients which follow a log don't
+    block other requests
+    """
+
+    daemon_threads = True
 
 
 class LogServer(BaseHTTPRequestHandler):
 
     def do_HEAD(s):
-        s.send_response(200)
-        s.send_header("Content-Type", "text")
-        s.end_headers()
+        s._route(head=True)
 
     def do_GET(s):
-        match = _logs_pattern.match(s.path)
+        s._route()
+
+    def _route(self, head=False):
+        """Dispatches a request to the log file or the live log of a job
+
+        :param bool head: Sends only the headers
+        """
 
-        if not match:
-            s.send_response(404)
-            s.send_header("Content-Type", "text")
-            s.end_headers()
+        match = _logs_pattern.match(self.path)
+        live_match = _live_pattern.match(self.path)
 
-            s.wfile.write(b"Invalid link!")
+        if live_match and not head:
+            self._follow(int(live_match.group(1)), int(live_match.group(2) or 0))
+        elif live_match:
+            self.send_response(200)
+            self.send_header("Content-Type", "text")
+            self.end_headers()
+        elif not match:
+            self._sendMessage(404, "Invalid link!", head)
         else:
-            log_path = "{}/{}.log".format(LOG_DIR, match.groups()[0])
+            self._serveLog("{}/{}.log".format(LOG_DIR, match.groups()[0]), head)
+
+    def _serveLog(self, log_path, head=False):
+        """Sends a log file
+
+        The file is sent with sendfile(), gzip compressed if the client accepts it. Range
+        requests and conditional requests (ETag/Last-Modified) are supported.
+
+        :param string log_path: The path to the log file
+        :param bool head: Sends only the headers
+        """
+
+        try:
+            stat = os.stat(log_path)
+        except OSError:
+            stat = None
+
+        if not stat or not S_ISREG(stat.st_mode):
+            self._serveCompressedLog("{}.gz".format(log_path), head)
+            return
+
+        byte_range = self._getRange(stat.st_size)
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header("Content-Range", "bytes */{}".format(stat.st_size))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        # ranges refer to the uncompressed file
+        compressed = byte_range is None and self._acceptsGzip()
+
+        etag = "\"{:x}-{:x}{}\"".format(stat.st_mtime_ns, stat.st_size,
+                                         "-gzip" if compressed else "")
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        if self._isNotModified(etag, stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return
+
+        if compressed:
+            log_path = self._getCompressedLog(log_path, stat.st_mtime)
+            offset, count = 0, os.stat(log_path).st_size
+        elif byte_range:
+            offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+        else:
+            offset, count = 0, stat.st_size
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(count))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+
+        if byte_range:
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(
+                byte_range[0], byte_range[1], stat.st_size
+            ))
 
-            if not os.path.isfile(log_path):
-                s.send_response(404)
-                s.send_header("Content-Type", "text")
-                s.end_headers()
+        self.end_headers()
 
-                s.wfile.write(b"Log file not found!")
+        if head or not count:
+            return
+
+        try:
+            with open(log_path, "rb") as log_file:
+                self.connection.sendfile(log_file, offset, count)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _serveCompressedLog(self, gz_path, head=False):
+        """Sends a log file which is stored gzip compressed
+
+        Clients which accept gzip get the file as it is (with sendfile()), the others get
+        it decompressed while it is sent. Range requests are not supported.
+
+        :param string gz_path: The path to the compressed log file
+        :param bool head: Sends only the headers
+        """
+
+        try:
+            stat = os.stat(gz_path)
+        except OSError:
+            stat = None
+
+        if not stat or not S_ISREG(stat.st_mode):
+            self._sendMessage(404, "Log file not found!", head)
+            return
+
+        compressed = self._acceptsGzip()
+
+        etag = "\"{:x}-{:x}{}\"".format(stat.st_mtime_ns, stat.st_size,
+                                         "-gzip" if compressed else "")
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        if self._isNotModified(etag, stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Accept-Ranges", "none")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(stat.st_size))
+        else:
+            # the decompressed size is unknown - the end of the connection ends the body
+            self.close_connection = True
+
+        self.end_headers()
+
+        if head:
+            return
+
+        try:
+            if compressed:
+                with open(gz_path, "rb") as log_file:
+                    self.connection.sendfile(log_file, 0, stat.st_size)
             else:
-                s.send_response(200)
-                s.send_header("Content-Type", "text")
-                s.end_headers()
+                with gzip.open(gz_path, "rb") as log_file:
+                    shutil.copyfileobj(log_file, self.wfile, LOG_STREAM_CHUNK_SIZE)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _getRange(self, size):
+        """Parses the Range header - only single byte ranges are supported
+
+        :param int size: The size of the file
+        :return tuple|None|bool: The first and the last byte of the range, None if the whole
+                                 file should be sent or False if the range can't be satisfied
+        """
+
+        match = _range_pattern.match(self.headers.get("Range", "").strip())
+
+        # other range units and multiple ranges are ignored
+        if not match or not any(match.groups()):
+            return None
+
+        start, end = match.groups()
+
+        # the last bytes of the file
+        if not start:
+            if not int(end) or not size:
+                return False
+
+            return max(size - int(end), 0), size - 1
+
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+
+        if start >= size or end < start:
+            return False
+
+        return start, end
+
+    def _acceptsGzip(self):
+        """Checks if the client accepts gzip compressed responses
+
+        :return bool: True if gzip is accepted
+        """
+
+        for coding in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = coding.partition(";")
+
+            if name.strip().lower() != "gzip":
+                continue
+
+            # 'gzip;q=0' means not acceptable
+            params = params.replace(" ", "")
+            try:
+                return not params.startswith("q=") or float(params[2:]) > 0
+            except ValueError:
+                return False
+
+        return False
+
+    def _isNotModified(self, etag, mtime):
+        """Checks the conditional request headers - If-None-Match wins over If-Modified-Since
+
+        :param string etag: The current entity tag
+        :param float mtime: The modification time of the file
+        :return bool: True if the client has the current version already
+        """
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError):
+                return False
+
+            return int(mtime) <= since
+
+        return False
+
+    def _getCompressedLog(self, log_path, mtime):
+        """Returns a gzip compressed copy of a log file - the copy is created once and reused
+        until the log file changes
+
+        :param string log_path: The path to the log file
+        :param float mtime: The modification time of the log file
+        :return string: The path to the compressed copy
+        """
+
+        gz_path = "{}.gz".format(log_path)
+
+        try:
+            if os.stat(gz_path).st_mtime >= mtime:
+                return gz_path
+        except FileNotFoundError:
+            pass
+
+        # concurrent requests write their own temporary file
+        tmp_path = "{}.{}.tmp".format(gz_path, threading.get_ident())
+
+        with open(log_path, "rb") as log_file:
+            with gzip.open(tmp_path, "wb") as gz_file:
+                shutil.copyfileobj(log_file, gz_file, LOG_STREAM_CHUNK_SIZE)
+
+        os.replace(tmp_path, gz_path)
+
+        return gz_path
+
+    def _sendMessage(self, status, message, head=False):
+        """Sends a short text response
+
+        :param int status: The HTTP status
+        :param string message: The message
+        :param bool head: Sends only the headers
+        """
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text")
+        self.end_headers()
+
+        if not head:
+            self.wfile.write(message.encode())
+
+    def _follow(self, job_id, offset):
+        """Sends the log of a job from a byte offset on and keeps sending new output until
+        the job is finished
+
+        :param int job_id: The id of the job
+        :param int offset: The byte offset where the log starts
+        """
+
+        try:
+            content, running = read_job_log(job_id, offset)
+        except JobLogNotFoundException as e:
+            self.send_response(404)
+            self.send_header("Content-Type", "text")
+            self.end_headers()
+
+            self.wfile.write(e.message.encode())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text")
+        self.send_header("X-Log-Offset", str(offset))
+        self.end_headers()
 
-                content = ""
-                with open(log_path, "r") as logfile:
-                    content = logfile.read()
+        try:
+            while content or running:
+                if content:
+                    self.wfile.write(content)
+                    self.wfile.flush()
+                    offset += len(content)
+                else:
+                    time.sleep(LIVE_LOG_POLL_INTERVAL)
 
-                s.wfile.write(content.encode())
+                content, running = read_job_log(job_id, offset)
+        except (JobLogNotFoundException, BrokenPipeError, ConnectionResetError):
+            return
 
     def log_message(self, format, *args):
         return
@@ -0,0 +1,160 @@
+#
+# Copyright (c) 2016 SUSE Linux GmbH
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, contact SUSE LLC.
+#
+# To contact SUSE about this file by physical or electronic mail,
+# you may find current contact information at www.suse.com
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from dapsenv.exceptions import SnapshotExportException
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Exports commits of documentation repositories to snapshot directories on the host
+
+    Every commit is exported only once to '<path>/<commit>/<repodir>', no matter how many
+    builds use it. A snapshot is in use as long as it was acquired more often than it was
+    released. Unused snapshots are removed by prune().
+    """
+
+    def __init__(self, path):
+        """Initializes the SnapshotStore class
+
+        :param string path: The directory where the snapshots are stored
+        """
+
+        self._path = path
+        self._lock = threading.Lock()
+        self._refs = {}
+        self._export_locks = {}
+
+    def acquire(self, repopath, commit):
+        """Returns the snapshot of a commit - exports it first if it does not exist yet
+
+        :param string repopath: The path to the repository or one of its worktrees
+        :param string commit: The commit hash
+        :return string: The path to the snapshot of the repository
+        """
+
+        repodir = os.path.basename(os.path.normpath(repopath))
+        snapshot = os.path.join(self._path, commit, repodir)
+
+        with self._lock:
+            self._refs[commit] = self._refs.get(commit, 0) + 1
+            export_lock = self._export_locks.setdefault(commit, threading.Lock())
+
+        try:
+            with export_lock:
+                if not os.path.isdir(snapshot):
+                    self._export(repopath, commit, repodir)
+        except Exception:
+            self.release(commit)
+            raise
+
+        return snapshot
+
+    def release(self, commit):
+        """Marks a snapshot as no longer used by a build
+
+        :param string commit: The commit hash
+        """
+
+        with self._lock:
+            self._refs[commit] -= 1
+
+            if not self._refs[commit]:
+                del self._refs[commit]
+
+    def prune(self, keep=()):
+        """Removes all snapshots which are not in use
+
+        :param iterable keep: Commit hashes whose snapshots should be kept anyway (like the
+                              current commits of all projects)
+        """
+
+        keep = set(keep)
+
+        for name in os.listdir(self._path):
+            # temporary export directories are named '.<commit>-<random>'
+            commit = name.lstrip(".").split("-")[0]
+
+            if commit in keep:
+                continue
+
+            with self._lock:
+                if commit in self._refs:
+                    continue
+
+                export_lock = self._export_locks.setdefault(commit, threading.Lock())
+
+            # the export lock keeps acquire() from using the snapshot while it gets removed
+            with export_lock:
+                with self._lock:
+                    if commit in self._refs:
+                        continue
+
+                    self._export_locks.pop(commit, None)
+
+                shutil.rmtree(os.path.join(self._path, name), ignore_errors=True)
+                log.debug("Snapshot %r removed.", name)
+
+    def _export(self, repopath, commit, repodir):
+        """Exports the files of a commit into the snapshot directory
+
+        The commit is unpacked into a temporary directory first, so that a snapshot is
+        either complete or not there at all.
+
+        :param string repopath: The path to the repository or one of its worktrees
+        :param string commit: The commit hash
+        :param string repodir: The directory name of the repository inside the snapshot
+        """
+
+        tmp_dir = tempfile.mkdtemp(prefix=".{}-".format(commit), dir=self._path)
+        commit_dir = os.path.join(self._path, commit)
+
+        archive_cmd = ["git", "archive", "--prefix={}/".format(repodir), commit]
+        unpack_cmd = ["tar", "-x", "-C", tmp_dir]
+
+        try:
+            archive = subprocess.Popen(archive_cmd, cwd=repopath, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+            unpack = subprocess.Popen(unpack_cmd, stdin=archive.stdout, stderr=subprocess.PIPE)
+            archive.stdout.close()
+
+            unpack_stderr = unpack.communicate()[1].decode("utf-8")
+            archive_stderr = archive.stderr.read().decode("utf-8")
+            archive.wait()
+
+            if archive.returncode:
+                raise SnapshotExportException(commit, " ".join(archive_cmd), archive_stderr)
+
+            if unpack.returncode:
+                raise SnapshotExportException(commit, " ".join(unpack_cmd), unpack_stderr)
+
+            # a snapshot of the commit can already exist for another repository directory
+            if os.path.isdir(commit_dir):
+                os.rename(os.path.join(tmp_dir, repodir), os.path.join(commit_dir, repodir))
+            else:
+                os.rename(tmp_dir, commit_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        log.debug("Commit %s exported to %r.", commit, commit_dir)
@@ -16,16 +16,37 @@
 # To contact SUSE about this file by physical or electronic mail,
 # you may find current contact information at www.suse.com
 
+import glob
 import os
+import threading
 from dapsenv.exceptions import XSLTProcException, InvalidRootIDException
 from lxml import etree
 
 import logging
 log = logging.getLogger(__name__)
 
-_used_files_sheet_path = "{}/data/get-all-used-files.xsl".format(
-    os.path.dirname(os.path.abspath(__file__))
-)
+_data_dir = "{}/data".format(os.path.dirname(os.path.abspath(__file__)))
+
+# compiled stylesheets - lxml XSLT objects must not be shared between threads
+_transforms = threading.local()
+
+
+def getTransform(name):
+    """Returns a compiled XSLT transform of a stylesheet from the data/ directory
+
+    Each stylesheet is compiled only once per thread and reused afterwards.
+
+    :param string name: The file name of the stylesheet (like 'rootid.xsl')
+    :return lxml.etree.XSLT: The compiled transform
+    """
+
+    if not hasattr(_transforms, "registry"):
+        _transforms.registry = {}
+
+    if name not in _transforms.registry:
+        _transforms.registry[name] = etree.XSLT(etree.parse("{}/{}".format(_data_dir, name)))
+
+    return _transforms.registry[name]
 
 
 def getAllUsedFiles(main, rootid):
@@ -36,16 +57,103 @@ def getAllUsedFiles(main, rootid):
     :return list: A list of all used files
     """
 
-    xslt_tree = etree.parse(_used_files_sheet_path)
-    transform = etree.XSLT(xslt_tree)
+    return getUsedAndDependencyFiles(main, rootid)[0]
+
+
+def getUsedAndDependencyFiles(main, rootid):
+    """Get all used files of an XML MAIN file and the files they were determined from
+
+    :param string main: the main file of a documentation
+    :param string rootid: the rootid of a DC file
+    :return tuple: A set of all used files and a set of all dependency files
+    """
+
+    return IncludeGraph(main).getUsedAndDependencyFiles(rootid)
+
+
+class IncludeGraph:
+    """The include graph of an XML MAIN file
+
+    The MAIN file gets parsed and transformed only once. Afterwards the used files of every
+    root id in the document can be looked up without touching the MAIN file again.
+    """
+
+    def __init__(self, main):
+        """Initializes the IncludeGraph class
+
+        :param string main: the main file of a documentation
+        """
+
+        self._main = main
+        self._main_dir = os.path.dirname(os.path.abspath(main))
+        self._rootids = {}
+
+        transform = getTransform("get-all-used-files.xsl")
+
+        main_tree = etree.parse(main,
+                                etree.XMLParser(load_dtd=True, resolve_entities=True))
+
+        self._tree = transform(main_tree)
+
+        self._entity_files = set(os.path.basename(path) for path in
+                                 glob.glob("{}/*.ent".format(self._main_dir)))
+
+    def getAllUsedFiles(self, rootid):
+        """Get all used files of a root id
+
+        :param string rootid: the rootid of a DC file
+        :return set: A set of all used files
+        """
+
+        return self.getUsedAndDependencyFiles(rootid)[0]
+
+    def getImages(self, rootid):
+        """Get all images of a root id
+
+        :param string rootid: the rootid of a DC file
+        :return set: A set of all image file names (as used in @fileref)
+        """
+
+        self.getUsedAndDependencyFiles(rootid)
+
+        return set(self._rootids[rootid][2])
+
+    def getUsedAndDependencyFiles(self, rootid):
+        """Get all used files of a root id and the files they were determined from
+
+        Besides the used files, this function returns all files which have an influence on
+        the set of used files: the MAIN file, all XML files on the include path from the MAIN
+        file to the rootid element, all XML files below the rootid element and all entity
+        files next to the MAIN file. All paths are relative to the directory of the MAIN file.
+
+        :param string rootid: the rootid of a DC file
+        :return tuple: A set of all used files and a set of all dependency files
+        """
+
+        if rootid not in self._rootids:
+            rootid_elem = self._tree.xpath("//div[@id=$rootid]", rootid=rootid)
+
+            if not rootid_elem:
+                raise InvalidRootIDException(rootid)
+
+            rootid_elem = rootid_elem[0]
+
+            used_files = set(rootid_elem.xpath(".//*/@href | .//*/@fileref"))
+            images = set(rootid_elem.xpath(".//image/@fileref"))
+
+            dependencies = set(rootid_elem.xpath(
+                "ancestor::div/@href | .//div[@text='false']/@href"
+            ))
+            dependencies.discard("")
+            dependencies.add(os.path.basename(self._main))
+            dependencies.update(self._entity_files)
 
-    main_tree = etree.parse(main,
-                            etree.XMLParser(load_dtd=True, resolve_entities=True))
+            self._rootids[rootid] = (used_files, dependencies, images)
 
-    result = transform(main_tree)
-    rootid_elem = result.find("//div[@id='{}']".format(rootid))
+        used_files, dependencies, images = self._rootids[rootid]
 
-    if rootid_elem is None:
-        raise InvalidRootIDException(rootid)
+        return set(used_files), set(dependencies)
 
-    return set(rootid_elem.xpath(".//*/@href | .//*/@fileref"))
+    @property
+    def main(self):
+        return self._main
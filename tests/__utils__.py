@@ -1,5 +1,6 @@
 import os
 import pytest
+import subprocess
 
 def make_tmp_file(existing_file, tmpdir):
     file_handle = tmpdir.join(existing_file)
@@ -12,3 +13,29 @@ def make_tmp_file(existing_file, tmpdir):
 
     file_handle.write(content)
     return file_handle
+
+
+def git(path, *args):
+    return subprocess.check_output(
+        ["git", "-C", path.__str__(), "-c", "user.name=Test", "-c", "user.email=test@example.com"] +
+        list(args)
+    ).decode("utf-8").strip()
+
+
+def commit(path, files, message):
+    for name, content in files.items():
+        path.join(name).write(content, ensure=True)
+
+    git(path, "add", "-A")
+    git(path, "commit", "-q", "-m", message)
+
+    return git(path, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmpdir):
+    path = tmpdir.join("repo")
+    path.ensure(dir=True)
+    git(path, "init", "-q", "-b", "develop")
+
+    return path
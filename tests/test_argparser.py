@@ -38,3 +38,13 @@ def test_return_version(monkeypatch, capsys):
     out, err = capsys.readouterr()
 
     assert out == "DAPS Build Environment Version {}\n".format(__version__)
+
+
+# it parses the job id and the offset of the follow-log command
+def test_parse_follow_log(monkeypatch):
+    monkeypatch.setattr(configmanager, 'get_prop', getprop)
+    args = ArgParser(["fl", "--offset", "42", "7"]).parse()
+
+    assert args['action'] == 'fl'
+    assert args['JOB-ID'] == [7]
+    assert args['offset'] == 42
@@ -0,0 +1,25 @@
+import pytest
+from collections import OrderedDict
+from dapsenv.autobuildconfig import AutoBuildConfig
+from dapsenv.general import BUILD_FORMATS
+
+data = [
+    ("", {"DC-a": BUILD_FORMATS, "DC-b": BUILD_FORMATS}),
+    ("<formats>html</formats>", {"DC-a": ["html"], "DC-b": ["html"]}),
+    ("<formats>html pdf html epub</formats><formats dc=\"DC-b\">pdf</formats>",
+     {"DC-a": ["html", "pdf"], "DC-b": ["pdf"]}),
+    ("<formats dc=\"DC-a\"></formats>", {"DC-a": [], "DC-b": BUILD_FORMATS})
+]
+
+
+# it determines the formats of each DC file
+@pytest.mark.parametrize("formats,expected", data)
+def test_parse_formats(tmpdir, formats, expected):
+    path = tmpdir.join("autobuild.xml")
+    path.write("<autobuild><set id=\"test\">{}</set></autobuild>".format(formats))
+
+    config = AutoBuildConfig(path.__str__())
+    project = config._tree.find("set")
+    dc_files = OrderedDict((dc, None) for dc in ("DC-a", "DC-b"))
+
+    assert config._parse_formats(project, "test", dc_files) == expected
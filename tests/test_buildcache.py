@@ -0,0 +1,85 @@
+import pytest
+from dapsenv.buildcache import BuildCache
+
+
+@pytest.fixture
+def builds_dir(tmpdir):
+    return tmpdir.mkdir("builds")
+
+
+# it returns archives of builds with the same key only
+def test_get(tmpdir, builds_dir):
+    builds_dir.join("1_test_html.tar.gz").write("archive")
+
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__())
+    cache.add("DC-test", "html", "sha256:1", "abc", "1_test_html.tar.gz")
+
+    assert cache.get("DC-test", "html", "sha256:1", "abc") == "1_test_html.tar.gz"
+    assert cache.get("DC-test", "pdf", "sha256:1", "abc") is None
+    assert cache.get("DC-test", "html", "sha256:2", "abc") is None
+    assert cache.get("DC-test", "html", "sha256:1", "def") is None
+
+    # the entries survive a restart
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__())
+    assert cache.get("DC-test", "html", "sha256:1", "abc") == "1_test_html.tar.gz"
+
+
+# it forgets archives which do not exist anymore
+def test_get_removed_archive(tmpdir, builds_dir):
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__())
+    cache.add("DC-test", "html", "sha256:1", "abc", "1_test_html.tar.gz")
+
+    assert cache.get("DC-test", "html", "sha256:1", "abc") is None
+
+
+# it hashes the input files independent of their order
+def test_get_input_hash():
+    first = BuildCache.getInputHash({"DC-test": "1", "xml/a.xml": "2"})
+    second = BuildCache.getInputHash({"xml/a.xml": "2", "DC-test": "1"})
+    changed = BuildCache.getInputHash({"xml/a.xml": "3", "DC-test": "1"})
+
+    assert first == second
+    assert first != changed
+
+
+# it keeps the entries of other build environments apart
+def test_environment(tmpdir, builds_dir):
+    builds_dir.join("1_test_html.tar.gz").write("archive")
+
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__(), "old")
+    cache.add("DC-test", "html", "sha256:1", "abc", "1_test_html.tar.gz")
+
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__(), "new")
+    assert cache.get("DC-test", "html", "sha256:1", "abc") is None
+
+
+# it removes entries of missing archives, other environments and other images
+def test_prune(tmpdir, builds_dir):
+    builds_dir.join("1_test_html.tar.gz").write("archive")
+    builds_dir.join("2_test_pdf.tar.gz").write("archive")
+
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__(), "old")
+    cache.add("DC-test", "html", "sha256:1", "abc", "1_test_html.tar.gz")
+
+    cache = BuildCache(tmpdir.join("cache.json").__str__(), builds_dir.__str__(), "new")
+    cache.add("DC-test", "html", "sha256:1", "abc", "1_test_html.tar.gz")
+    cache.add("DC-test", "pdf", "sha256:1", "abc", "2_test_pdf.tar.gz")
+    cache.add("DC-test", "pdf", "sha256:2", "abc", "2_test_pdf.tar.gz")
+    cache.add("DC-test", "html", "sha256:1", "def", "3_test_html.tar.gz")
+
+    assert cache.prune("sha256:1") == 3
+    assert cache.get("DC-test", "html", "sha256:1", "abc") == "1_test_html.tar.gz"
+    assert cache.get("DC-test", "pdf", "sha256:1", "abc") == "2_test_pdf.tar.gz"
+    assert cache.prune("sha256:1") == 0
+
+
+# it hashes the build scripts and the version
+def test_get_environment_hash(tmpdir):
+    script = tmpdir.join("build.sh")
+    script.write("daps")
+    first = BuildCache.getEnvironmentHash([script.__str__()], "1.0.0")
+
+    assert first != BuildCache.getEnvironmentHash([script.__str__()], "1.0.1")
+
+    script.write("daps -vv")
+    assert first != BuildCache.getEnvironmentHash([script.__str__()], "1.0.0")
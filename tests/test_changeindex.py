@@ -0,0 +1,33 @@
+from dapsenv.changeindex import ChangeIndex
+
+
+# it returns all DC files which use one of the changed files
+def test_get_affected_dc_files():
+    index = ChangeIndex()
+    index.update("DC-a", ["xml/MAIN.test.xml", "xml/book_a.xml"], ["img_a1.png"])
+    index.update("DC-b", ["xml/MAIN.test.xml", "xml/book_b.xml"])
+
+    assert index.getAffectedDCFiles(["xml/book_a.xml"]) == set(["DC-a"])
+    assert index.getAffectedDCFiles(["xml/MAIN.test.xml"]) == set(["DC-a", "DC-b"])
+    assert index.getAffectedDCFiles(["images/src/svg/img_a1.svg"]) == set(["DC-a"])
+    assert index.getAffectedDCFiles(["README.md"]) == set()
+
+
+# it replaces the indexed files of a DC file
+def test_update():
+    index = ChangeIndex()
+    index.update("DC-a", ["xml/book_a.xml"])
+    index.update("DC-a", ["xml/book_b.xml"])
+
+    assert index.getAffectedDCFiles(["xml/book_a.xml"]) == set()
+    assert index.getAffectedDCFiles(["xml/book_b.xml"]) == set(["DC-a"])
+
+
+# it removes a DC file from the index
+def test_remove():
+    index = ChangeIndex()
+    index.update("DC-a", ["xml/book_a.xml"])
+    index.remove("DC-a")
+
+    assert "DC-a" not in index
+    assert index.getAffectedDCFiles(["xml/book_a.xml"]) == set()
@@ -0,0 +1,97 @@
+import itertools
+import pytest
+import time
+from dapsenv.containerpool import ContainerPool
+
+ids = itertools.count(1)
+
+
+class FakeContainer:
+    def __init__(self):
+        self.container_id = None
+        self.killed = False
+        self.resets = 0
+
+    def spawn(self):
+        self.container_id = str(next(ids))
+
+    def getContainerID(self):
+        return self.container_id
+
+    def reset(self):
+        self.resets += 1
+
+    def kill(self):
+        self.killed = True
+
+
+class BrokenContainer(FakeContainer):
+    def reset(self):
+        raise Exception("reset failed")
+
+
+def wait_for_idle(pool, count):
+    for i in range(100):
+        if pool.idleCount >= count:
+            return
+        time.sleep(0.01)
+
+
+# it keeps the minimum amount of idle containers warm
+def test_start():
+    pool = ContainerPool(2, 5, 10, factory=FakeContainer)
+    pool.start()
+    wait_for_idle(pool, 2)
+
+    assert pool.idleCount == 2
+
+
+# it reuses released containers
+def test_lease_release():
+    pool = ContainerPool(0, 5, 10, factory=FakeContainer)
+
+    container = pool.lease()
+    pool.release(container)
+
+    assert container.resets == 1
+    assert not container.killed
+    assert pool.lease() is container
+
+
+data = [
+    (ContainerPool(0, 5, 1, factory=FakeContainer), True),
+    (ContainerPool(0, 0, 10, factory=FakeContainer), True),
+    (ContainerPool(0, 5, 10, factory=FakeContainer), False),
+    (ContainerPool(0, 5, 10, factory=BrokenContainer), True)
+]
+
+
+# it kills containers which must not be reused
+@pytest.mark.parametrize("pool,reuse", data)
+def test_release_kill(pool, reuse):
+    container = pool.lease()
+    pool.release(container, reuse)
+
+    assert container.killed
+    assert pool.idleCount == 0
+
+
+# it kills the idle containers on shutdown and the leased ones once they are released
+def test_shutdown():
+    pool = ContainerPool(2, 5, 10, factory=FakeContainer)
+    pool.start()
+    wait_for_idle(pool, 2)
+
+    container = pool.lease()
+    wait_for_idle(pool, 2)
+    idle = list(pool._idle)
+
+    pool.shutdown()
+
+    assert all(c.killed for c in idle)
+    assert pool.idleCount == 0
+
+    pool.release(container)
+
+    assert container.killed
+    assert pool.idleCount == 0
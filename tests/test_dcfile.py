@@ -5,7 +5,7 @@ from dapsenv.dcfile import DCFile
 from _pytest.runner import Failed
 from __utils__ import make_tmp_file
 
-data = [
+valid_data = [
     (
         "DC-suse-openstack-cloud-admin",
         "bk_openstack_admin.xml",
@@ -32,7 +32,7 @@ data = [
         None
     )
 ]
-@pytest.mark.parametrize("dcfile,expected_main,expected_rootid", data)
+@pytest.mark.parametrize("dcfile,expected_main,expected_rootid", valid_data)
 def test_tryparse(dcfile, expected_main, expected_rootid, tmpdir):
     test_file = make_tmp_file(dcfile, tmpdir)
     main_path = "{}/xml/{}".format(
@@ -58,3 +58,16 @@ def test_tryparse_fail(dcfile, tmpdir):
 
     with pytest.raises(DCFileMAINNotFoundException):
         DCFile(test_file.__str__())
+
+
+# it parses the content of a DC file without reading it from disk
+@pytest.mark.parametrize("dcfile,expected_main,expected_rootid", valid_data)
+def test_tryparse_content(dcfile, expected_main, expected_rootid):
+    test_data = "{}/data".format(os.path.dirname(os.path.realpath(__file__)))
+
+    with open("{}/{}".format(test_data, dcfile)) as f:
+        dc = DCFile("/nonexistent/{}".format(dcfile), f.read())
+
+    assert dc.main == expected_main
+    assert dc.main_path == "/nonexistent/xml/{}".format(expected_main)
+    assert dc.rootid == expected_rootid
@@ -0,0 +1,58 @@
+import dapsenv.xslt as xslt
+import os
+import pytest
+import shutil
+from dapsenv.dependencycache import DependencyCache
+
+test_data_dir = "{}/data/docbook".format(os.path.dirname(os.path.realpath(__file__)))
+
+
+@pytest.fixture
+def repo(tmpdir):
+    path = tmpdir.join("repo")
+    shutil.copytree(test_data_dir, path.__str__())
+
+    return path
+
+
+def main_path(repo):
+    return "{}/xml/MAIN.test.xml".format(repo)
+
+
+def fail(main):
+    pytest.fail("The dependency cache was not used.")
+
+
+# it returns the used files of a root id
+def test_get_all_used_files(repo, tmpdir):
+    cache = DependencyCache(tmpdir.join("cache.json").__str__())
+
+    assert cache.getAllUsedFiles(repo.__str__(), "develop", main_path(repo), "book.a") == \
+        set(["cha_a1.xml", "img_a1.png"])
+
+
+# it reuses the cache file as long as no dependency changes
+def test_cache_reused(repo, tmpdir, monkeypatch):
+    cache_path = tmpdir.join("cache.json").__str__()
+
+    cache = DependencyCache(cache_path)
+    expected = cache.getAllUsedFiles(repo.__str__(), "develop", main_path(repo), "book.a")
+    cache.save()
+
+    monkeypatch.setattr(xslt, "IncludeGraph", fail)
+
+    cache = DependencyCache(cache_path)
+    assert cache.getAllUsedFiles(repo.__str__(), "develop", main_path(repo), "book.a") == expected
+
+
+# it invalidates an entry if a dependency has changed
+def test_cache_invalidated(repo, tmpdir):
+    cache = DependencyCache(tmpdir.join("cache.json").__str__())
+    cache.getAllUsedFiles(repo.__str__(), "develop", main_path(repo), "book.a")
+
+    book = repo.join("xml", "book_a.xml")
+    book.write(book.read().replace("<xi:include href=\"cha_a1.xml\"/>",
+                                   "<xi:include href=\"cha_b1.xml\"/>"))
+
+    assert cache.getAllUsedFiles(repo.__str__(), "develop", main_path(repo), "book.a") == \
+        set(["cha_b1.xml", "img_b1.png"])
@@ -0,0 +1,109 @@
+import io
+import pytest
+import tarfile
+from dapsenv.docker import Container, CONTAINER_SCRIPTS
+from dapsenv.exceptions import ContainerBuildFileNotAvailableException
+
+
+# it packs all build scripts owned by root
+def test_get_scripts_archive():
+    data = Container()._get_scripts_archive()
+
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        members = tar.getmembers()
+
+    assert sorted(member.name for member in members) == sorted(CONTAINER_SCRIPTS)
+    assert all(member.uid == 0 and member.uname == "root" for member in members)
+
+
+class FakeContainer(Container):
+    def __init__(self, files):
+        Container.__init__(self)
+        self._spawned = True
+        self._prepdone = True
+        self._container_id = "1234"
+        self._repodir = "repo"
+        self.files = files
+        self.commands = []
+
+    def execute(self, command):
+        self.commands.append(command)
+        return {"stdout": "", "stderr": ""}
+
+    def executeStream(self, command, output):
+        self.commands.append(command)
+        output.write(b"daps output")
+        return 0
+
+    def fetchArchive(self, path, fileobj):
+        self.commands.append("fetch {}".format(path))
+
+        directory = path.split("/")[-1]
+
+        with tarfile.open(fileobj=fileobj, mode="w") as tar:
+            for name, data in self.files.items():
+                if not name.startswith("{}/".format(directory)):
+                    continue
+
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+
+
+# it builds the formats one after another and fetches each result as soon as it is built
+def test_build_documentations(monkeypatch, tmpdir):
+    monkeypatch.setattr("dapsenv.docker.TMP_DIR", tmpdir.__str__())
+
+    container = FakeContainer({
+        "html/result.json": b'{"status": "success", "compile_time": 12, "product": "SLES"}',
+        "html/build.log": b"html log",
+        "html/documentation.tar": b"archive",
+        "pdf/result.json": b'{"status": "error", "compile_time": 3}',
+        "pdf/build.log": b"pdf log"
+    })
+
+    log_path = tmpdir.join("running.log").__str__()
+    results = container.buildDocumentations("DC-test", ["html", "pdf"], log_path)
+    html = next(results)
+
+    assert len(container.commands) == 2
+    assert container.commands[0].startswith("/tmp/build.sh DC-test html ")
+    assert container.commands[1] == "fetch /tmp/result/html"
+
+    pdf = next(results)
+
+    assert container.commands[2].startswith("/tmp/build.sh DC-test pdf ")
+    assert container.commands[3] == "fetch /tmp/result/pdf"
+    assert html["build_status"] and html["compile_time"] == 12 and html["product"] == "SLES"
+    assert open(html["archive_name"], "rb").read() == b"archive"
+    assert not pdf["build_status"] and open(pdf["log_name"]).read() == "pdf log"
+    assert pdf["archive_name"] is None
+    assert open(log_path).read() == "daps outputdaps output"
+
+
+# it fails if the result of a format is missing
+def test_build_documentations_missing_result(monkeypatch, tmpdir):
+    monkeypatch.setattr("dapsenv.docker.TMP_DIR", tmpdir.__str__())
+
+    container = FakeContainer({
+        "html/result.json": b'{"status": "success", "compile_time": 12}',
+        "html/build.log": b"html log",
+        "html/documentation.tar": b"archive"
+    })
+
+    results = container.buildDocumentations("DC-test", ["html", "pdf"])
+    html = next(results)
+
+    assert html["build_status"]
+
+    with pytest.raises(ContainerBuildFileNotAvailableException):
+        next(results)
+
+
+# it resets the container with the cleanup script
+def test_reset():
+    container = FakeContainer({})
+    container.reset()
+
+    assert container.commands == ["/tmp/cleanup.sh --reset"]
+    assert not container._prepdone
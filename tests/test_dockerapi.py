@@ -0,0 +1,263 @@
+import base64
+import io
+import json
+import pytest
+import socketserver
+import struct
+import tarfile
+import threading
+import time
+from dapsenv.docker import APIContainer
+from dapsenv.dockerapi import DockerClient
+from dapsenv.exceptions import DockerAPIException
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._route()
+
+    def do_HEAD(self):
+        self._route()
+
+    def do_POST(self):
+        self._route()
+
+    def do_PUT(self):
+        self._route()
+
+    def do_DELETE(self):
+        self._route()
+
+    def _route(self):
+        url = urlparse(self.path)
+        path = url.path[len("/v1.24"):]
+        query = dict((key, value[0]) for key, value in parse_qs(url.query).items())
+        body = self._read_body()
+        state = self.server.state
+
+        if path == "/containers/create":
+            state["config"] = json.loads(body.decode("utf-8"))
+            state["created"] = state.get("created", 0) + 1
+            self._json(201, {"Id": "c1"})
+        elif path in ("/containers/c1/start", "/containers/c1"):
+            self._json(204 if self.command != "GET" else 200, None)
+        elif path == "/containers/c1/json":
+            self._json(200, {"Id": "c1", "State": {"Running": True}})
+
+            # closes the connection without telling the client
+            self.close_connection = state.get("drop", False)
+        elif path == "/containers/c1/exec":
+            state["cmd"] = json.loads(body.decode("utf-8"))["Cmd"]
+            self._json(201, {"Id": "e1"})
+        elif path == "/exec/e1/start":
+            # the Docker daemon streams the output and closes the connection
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+            self.end_headers()
+            self.wfile.write(frame(1, b"out") + frame(2, b"err") + frame(1, b"put"))
+            self.close_connection = True
+        elif path == "/exec/e1/json":
+            self._json(200, {"ExitCode": 3})
+        elif path == "/containers/c1/archive":
+            self._archive(query["path"], body)
+        elif path.startswith("/images/"):
+            self._json(404, {"message": "no such image"})
+        else:
+            self._json(500, {"message": "unknown path"})
+
+    def _archive(self, path, body):
+        files = self.server.state.setdefault("files", {})
+
+        if self.command == "PUT":
+            with tarfile.open(fileobj=io.BytesIO(body)) as tar:
+                for member in tar:
+                    files["{}/{}".format(path.rstrip("/"), member.name)] = \
+                        tar.extractfile(member).read()
+            self._json(200, None)
+        elif path == "/tmp":
+            stat = {"name": "tmp", "size": 0, "mode": (1 << 31) | 0o755}
+            self._json(200, None, {"X-Docker-Container-Path-Stat":
+                                   base64.b64encode(json.dumps(stat).encode("utf-8"))})
+        elif path not in files:
+            self._json(404, {"message": "no such file"})
+        elif self.command == "HEAD":
+            stat = {"name": path.split("/")[-1], "size": len(files[path]), "mode": 0o644}
+            self._json(200, None, {"X-Docker-Container-Path-Stat":
+                                   base64.b64encode(json.dumps(stat).encode("utf-8"))})
+        else:
+            data = io.BytesIO()
+            with tarfile.open(fileobj=data, mode="w") as tar:
+                info = tarfile.TarInfo(path.split("/")[-1])
+                info.size = len(files[path])
+                tar.addfile(info, io.BytesIO(files[path]))
+
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data.getvalue())))
+            self.end_headers()
+            self.wfile.write(data.getvalue())
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+
+                if not size:
+                    return b"".join(chunks)
+
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8") if data is not None else b""
+
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value.decode("utf-8"))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+class FakeDockerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def frame(stream, data):
+    return struct.pack(">BxxxL", stream, len(data)) + data
+
+
+@pytest.fixture
+def server(tmpdir):
+    server = FakeDockerServer(tmpdir.join("docker.sock").__str__(), FakeDockerHandler)
+    server.connections = 0
+    server.state = {}
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = DockerClient(server.server_address)
+
+    yield client
+
+    client.close()
+
+
+# it sends all requests over one connection
+def test_connection_reuse(server, client):
+    for i in range(3):
+        assert client.inspectContainer("c1")["Id"] == "c1"
+
+    assert server.connections == 1
+
+
+# it does not send a request with side effects over a connection which the server has closed
+def test_closed_connection(server, client):
+    server.state["drop"] = True
+    client.inspectContainer("c1")
+
+    # wait until the server has closed the connection
+    while not client._isClosed(client._idle[0]):
+        time.sleep(0.01)
+
+    assert client.createContainer("image", ["sh"]) == "c1"
+    assert server.state["created"] == 1
+    assert server.connections == 2
+
+
+# it splits the output of a command and opens a new connection after it
+def test_execute(server, client):
+    output = client.execute("c1", ["cat", "/tmp/file"])
+
+    assert output == {"stdout": b"output", "stderr": b"err", "exit_code": 3}
+    assert server.state["cmd"] == ["cat", "/tmp/file"]
+    assert server.connections == 2
+
+
+# it writes the output of a command to a file object while it is produced
+def test_execute_stream(server, client):
+    output = io.BytesIO()
+
+    assert client.executeStream("c1", ["/tmp/build.sh"], output, chunk_size=2) == 3
+    assert output.getvalue() == b"outerrput"
+    assert server.state["cmd"] == ["/tmp/build.sh"]
+
+
+# it puts a streamed archive and gets it back
+def test_archive(client):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode="w") as tar:
+        info = tarfile.TarInfo("build.sh")
+        info.size = 4
+        tar.addfile(info, io.BytesIO(b"echo"))
+
+    data.seek(0)
+    client.putArchive("c1", "/tmp", data)
+
+    with tarfile.open(fileobj=io.BytesIO(client.getArchive("c1", "/tmp/build.sh"))) as tar:
+        assert tar.extractfile("build.sh").read() == b"echo"
+
+    # streamed into a file object
+    archive = io.BytesIO()
+    assert client.getArchive("c1", "/tmp/build.sh", archive, chunk_size=16) is None
+
+    archive.seek(0)
+    with tarfile.open(fileobj=archive) as tar:
+        assert tar.extractfile("build.sh").read() == b"echo"
+
+    with pytest.raises(DockerAPIException):
+        client.getArchive("c1", "/tmp/missing", io.BytesIO())
+
+    assert client.statPath("c1", "/tmp/build.sh")["size"] == 4
+    assert client.statPath("c1", "/tmp/missing") is None
+
+
+# it reports API errors
+def test_errors(client):
+    assert not client.imageExists("mschnitzer/dapsenv")
+
+    with pytest.raises(DockerAPIException) as e:
+        client.inspectContainer("unknown")
+
+    assert e.value.status == 500
+
+
+# it controls a container with the same interface as the docker CLI backend
+def test_api_container(server, client, tmpdir):
+    container = APIContainer(client)
+
+    assert container.spawn() == "c1"
+    assert server.state["config"]["HostConfig"]["Binds"] == []
+
+    container.fileCreate("/tmp/build_info.json", "{}")
+    container.fetch("/tmp/build_info.json", tmpdir.__str__())
+
+    assert container.fileAvailable("/tmp/build_info.json")
+    assert not container.fileAvailable("/tmp/missing")
+    assert tmpdir.join("build_info.json").read() == "{}"
+    assert container.execute("cat /tmp/file") == {"stdout": "output", "stderr": "err"}
+
+    container.kill()
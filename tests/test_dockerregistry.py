@@ -0,0 +1,46 @@
+import pytest
+from dapsenv.dockerregistry import get_image_id
+from dapsenv.exceptions import DockerRegisteryException
+
+
+class FakeProcess:
+    def __init__(self, cmd, returncode, stdout, stderr):
+        self.cmd = cmd
+        self.returncode = returncode
+        self._stdout = stdout
+        self._stderr = stderr
+
+    def communicate(self):
+        return self._stdout, self._stderr
+
+
+data = [
+    (0, b"sha256:abc\n", b"", "sha256:abc"),
+    (1, b"\n", b"Error: No such image: mschnitzer/dapsenv\n", None)
+]
+
+
+# it returns the id of the image 'docker run' uses
+@pytest.mark.parametrize("returncode,stdout,stderr,expected", data)
+def test_get_image_id(monkeypatch, returncode, stdout, stderr, expected):
+    commands = []
+
+    def popen(cmd, **kwargs):
+        commands.append(cmd)
+        return FakeProcess(cmd, returncode, stdout, stderr)
+
+    monkeypatch.setattr("subprocess.Popen", popen)
+
+    assert get_image_id("mschnitzer/dapsenv") == expected
+    assert commands == [["docker", "image", "inspect", "--format", "{{.Id}}",
+                         "mschnitzer/dapsenv"]]
+
+
+# it reports other errors of docker
+def test_get_image_id_error(monkeypatch):
+    monkeypatch.setattr("subprocess.Popen", lambda cmd, **kwargs: FakeProcess(
+        cmd, 1, b"", b"Cannot connect to the Docker daemon\n"
+    ))
+
+    with pytest.raises(DockerRegisteryException):
+        get_image_id("mschnitzer/dapsenv")
@@ -0,0 +1,189 @@
+import dapsenv.git as git_module
+import pytest
+import time
+from __utils__ import commit, git, repo
+from dapsenv.exceptions import (GitErrorException, GitInvalidBranchName, GitInvalidRepoException,
+                                GitTimeoutException)
+from dapsenv.git import Repository
+
+
+# it fails if the directory is not a git repository
+def test_invalid_repo(tmpdir):
+    with pytest.raises(GitInvalidRepoException):
+        Repository(tmpdir.__str__())
+
+
+# it returns the current branch and the last commit of a branch
+def test_last_commit_hash(repo):
+    first = commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+    repository = Repository(repo.__str__())
+
+    assert repository.branch() == "develop"
+    assert repository.getLastCommitHash("develop") == first
+
+    second = commit(repo, {"DC-test": "MAIN=main.xml"}, "second")
+
+    assert repository.getLastCommitHash("develop") == second
+
+    with pytest.raises(GitInvalidBranchName):
+        repository.getLastCommitHash("missing")
+
+
+# it returns the same changed files as 'git diff --name-only'
+def test_changed_files(repo):
+    first = commit(repo, {"DC-test": "MAIN=test.xml", "xml/a.xml": "a", "xml/b.xml": "b",
+                          "images/src/png/a.png": "a"}, "first")
+    git(repo, "rm", "-q", "xml/b.xml")
+    second = commit(repo, {"xml/a.xml": "changed", "xml/c.xml": "c", "images/src/svg/a.svg": "a"},
+                    "second")
+
+    repository = Repository(repo.__str__())
+
+    assert repository.getChangedFilesBetweenCommits(first, second) == \
+        git(repo, "diff", "--no-renames", "--name-only", first, second).split("\n")
+
+    with pytest.raises(GitErrorException):
+        repository.getChangedFilesBetweenCommits("0" * 40, second)
+
+
+# it reports missing tree objects and can be restarted after it was closed
+def test_missing_tree(repo):
+    first = commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+    repository = Repository(repo.__str__())
+
+    with pytest.raises(GitErrorException):
+        repository._readTree("0" * 40)
+
+    repository.close()
+
+    assert repository._objects._process is None
+    assert repository.getLastCommitHash("develop") == first
+
+    repository.close()
+
+
+# it reports missing files whose path contains spaces
+def test_missing_file_with_spaces(repo):
+    commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+    repository = Repository(repo.__str__())
+
+    with pytest.raises(GitErrorException):
+        repository.getFileContent("develop", "x y")
+
+    assert repository.getObjectIDs("develop", ["a b c"]) == {"a b c": None}
+
+    repository.close()
+
+
+# it fetches new commits only if the remote branch has changed
+def test_update(repo, tmpdir):
+    first = commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+    git(repo, "branch", "-q", "maintenance")
+
+    clone = tmpdir.join("clone")
+    git(tmpdir, "clone", "-q", repo.__str__(), clone.__str__())
+    git(clone, "branch", "-q", "maintenance", "origin/maintenance")
+    repository = Repository(clone.__str__())
+
+    assert repository.update("develop") == first
+
+    second = commit(repo, {"DC-test": "MAIN=main.xml"}, "second")
+    git(repo, "checkout", "-q", "maintenance")
+    third = commit(repo, {"DC-test": "MAIN=maintenance.xml"}, "third")
+
+    # local changes in the checkout survive the update of its branch
+    clone.join("DC-test").write("MAIN=local.xml")
+
+    assert repository.update("develop") == second
+    assert repository.update("maintenance") == third
+    assert repository.branch() == "develop"
+    assert clone.join("DC-test").read() == "MAIN=local.xml"
+
+    # rewritten remote branches replace the local branches
+    git(repo, "reset", "-q", "--hard", first)
+    fourth = commit(repo, {"DC-test": "MAIN=rewritten.xml"}, "fourth")
+    git(repo, "checkout", "-q", "develop")
+    git(repo, "reset", "-q", "--hard", first)
+    fifth = commit(repo, {"DC-test": "MAIN=force.xml"}, "fifth")
+
+    assert repository.update("develop") == fifth
+    assert repository.update("maintenance") == fourth
+    assert clone.join("DC-test").read() == "MAIN=local.xml"
+
+
+# it gives up if the deadline of the update has passed
+def test_update_deadline(repo, tmpdir):
+    commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+
+    clone = tmpdir.join("clone")
+    git(tmpdir, "clone", "-q", repo.__str__(), clone.__str__())
+    repository = Repository(clone.__str__())
+
+    with pytest.raises(GitTimeoutException):
+        repository.update("develop", time.time() - 1)
+
+    repository.close()
+
+
+# it keeps one detached worktree per branch and never switches the branch of the repository
+def test_worktree(repo, tmpdir, monkeypatch):
+    monkeypatch.setattr(git_module, "WORKTREES_DIR", tmpdir.join("worktrees").__str__())
+
+    first = commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+    git(repo, "branch", "-q", "maintenance")
+    second = commit(repo, {"DC-test": "MAIN=main.xml"}, "second")
+
+    repository = Repository(repo.__str__())
+    develop = repository.worktree("develop")
+    maintenance = repository.worktree("maintenance")
+
+    assert develop != maintenance
+    assert develop.endswith("/repo")
+    assert open("{}/DC-test".format(develop)).read() == "MAIN=main.xml"
+    assert open("{}/DC-test".format(maintenance)).read() == "MAIN=test.xml"
+
+    repository.updateWorktree("develop", first)
+
+    assert open("{}/DC-test".format(develop)).read() == "MAIN=test.xml"
+    assert repository.worktree("develop") == develop
+    assert open("{}/DC-test".format(develop)).read() == "MAIN=main.xml"
+    assert repository.branch() == "develop"
+
+
+# it creates the local branch of a worktree from the remote branch
+def test_worktree_remote_branch(repo, tmpdir, monkeypatch):
+    monkeypatch.setattr(git_module, "WORKTREES_DIR", tmpdir.join("worktrees").__str__())
+
+    commit(repo, {"DC-test": "MAIN=test.xml"}, "first")
+    git(repo, "checkout", "-q", "-b", "maintenance")
+    second = commit(repo, {"DC-test": "MAIN=maintenance.xml"}, "second")
+
+    clone = tmpdir.join("clone")
+    git(tmpdir, "clone", "-q", "-b", "develop", repo.__str__(), clone.__str__())
+    repository = Repository(clone.__str__())
+    maintenance = repository.worktree("maintenance")
+
+    assert repository.getLastCommitHash("maintenance") == second
+    assert open("{}/DC-test".format(maintenance)).read() == "MAIN=maintenance.xml"
+
+    with pytest.raises(GitErrorException):
+        repository.worktree("missing")
+
+    repository.close()
+
+
+# it returns the same object hashes as 'git rev-parse'
+def test_object_ids(repo):
+    first = commit(repo, {"DC-test": "MAIN=test.xml", "xml/a.xml": "a",
+                          "images/src/png/a.png": "a"}, "first")
+
+    repository = Repository(repo.__str__())
+    paths = ["", "DC-test", "xml/a.xml", "images", "xml/missing.xml", "DC-test/a.xml"]
+    object_ids = repository.getObjectIDs(first, paths)
+
+    assert object_ids[""] == git(repo, "rev-parse", "{}^{{tree}}".format(first))
+    assert object_ids["DC-test"] == git(repo, "rev-parse", "{}:DC-test".format(first))
+    assert object_ids["xml/a.xml"] == git(repo, "rev-parse", "{}:xml/a.xml".format(first))
+    assert object_ids["images"] == git(repo, "rev-parse", "{}:images".format(first))
+    assert object_ids["xml/missing.xml"] is None
+    assert object_ids["DC-test/a.xml"] is None
@@ -0,0 +1,58 @@
+import gzip
+import pytest
+from dapsenv.api.livelog import handle
+from dapsenv.exceptions import APIErrorException, JobLogNotFoundException
+from dapsenv.joblog import finish_job_log, read_job_log, remove_job_logs
+
+
+class FakeDaemon:
+    def getJobList(self):
+        return [{"id": 2, "status": 0}]
+
+
+@pytest.fixture
+def logs(monkeypatch, tmpdir):
+    running = tmpdir.mkdir("running")
+
+    monkeypatch.setattr("dapsenv.joblog.LOG_DIR", tmpdir.__str__())
+    monkeypatch.setattr("dapsenv.joblog.RUNNING_LOG_DIR", running.__str__())
+
+    running.join("1.log").write("validate\nhtml\n")
+
+    return tmpdir
+
+
+# it reads the log of a job from an offset - also after the job has been finished
+def test_read_job_log(logs):
+    assert read_job_log(1, 0, 8) == (b"validate", True)
+    assert read_job_log(1, 9) == (b"html\n", True)
+
+    finish_job_log(1)
+
+    assert logs.join("running", "1.log").check() is False
+    assert gzip.open(logs.join("job_1.log.gz").__str__()).read() == b"validate\nhtml\n"
+    assert read_job_log(1, 9) == (b"html\n", False)
+    assert read_job_log(1, 14) == (b"", False)
+
+    with pytest.raises(JobLogNotFoundException):
+        read_job_log(3, 0)
+
+    remove_job_logs()
+
+    assert logs.join("job_1.log.gz").check() is False
+
+
+# it returns chunks of a job log and their next offset over the API
+def test_live_log_api(logs):
+    assert handle({"job_id": 1, "offset": 9}, FakeDaemon()) == {
+        "job_id": 1, "offset": 14, "running": True, "log": "aHRtbAo="
+    }
+
+    # a scheduled job has no log yet
+    assert handle({"job_id": 2}, FakeDaemon())["running"]
+
+    with pytest.raises(APIErrorException):
+        handle({"job_id": 3}, FakeDaemon())
+
+    with pytest.raises(APIErrorException):
+        handle({"job_id": 1, "offset": "end"}, FakeDaemon())
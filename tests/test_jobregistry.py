@@ -0,0 +1,111 @@
+import pytest
+from dapsenv.exceptions import JobNotFoundException
+from dapsenv.jobregistry import JobRegistry, JOB_PENDING, JOB_RUNNING, JOB_FINISHED
+
+project = {"project": "test-project", "vcs_branch": "develop"}
+
+
+# it assigns unique ids and keeps the queue order
+def test_add():
+    registry = JobRegistry()
+
+    first = registry.add(project, "DC-test", "abc")
+    second = registry.add(project, "DC-other", "abc")
+
+    assert first["id"] != second["id"]
+    assert first["status"] == JOB_PENDING
+    assert registry.pendingCount == 2
+    assert registry.nextPending() is first
+    assert registry.getByDCFile("DC-test") == [first]
+    assert registry.getByDCFile("DC-other") == [second]
+
+
+# it moves jobs from pending to running to finished
+def test_lifecycle():
+    registry = JobRegistry()
+    job = registry.add(project, "DC-test", "abc")
+
+    registry.start(job["id"])
+    registry.setContainerID(job["id"], "1234")
+
+    assert job["status"] == JOB_RUNNING
+    assert job["container_id"] == "1234"
+    assert registry.pendingCount == 0
+    assert registry.runningCount == 1
+    assert registry.nextPending() is None
+
+    registry.finish(job["id"])
+
+    assert job["status"] == JOB_FINISHED
+    assert registry.runningCount == 0
+    assert registry.jobs() == []
+    assert registry.get(job["id"]) is job
+
+
+# it forgets the oldest finished jobs
+def test_finished_limit():
+    registry = JobRegistry(finished_limit=1)
+
+    first = registry.add(project, "DC-first", "abc")
+    second = registry.add(project, "DC-second", "abc")
+
+    for job in (first, second):
+        registry.start(job["id"])
+        registry.finish(job["id"])
+
+    assert registry.getByDCFile("DC-first") == []
+    assert registry.get(second["id"]) is second
+
+    with pytest.raises(JobNotFoundException):
+        registry.get(first["id"])
+
+
+# it merges pending jobs of the same DC file and keeps the newest commit
+def test_add_coalesce():
+    registry = JobRegistry()
+
+    first = registry.add(project, "DC-test", "abc")
+    second = registry.add(project, "DC-test", "def")
+    other = registry.add(project, "DC-other", "def")
+
+    assert first is second
+    assert first["commit"] == "def"
+    assert registry.pendingCount == 2
+    assert registry.getByDCFile("DC-test") == [first]
+    assert other is not first
+
+
+# it allows one follow-up job for a running job
+def test_add_follow_up():
+    registry = JobRegistry()
+
+    running = registry.add(project, "DC-test", "abc")
+    registry.start(running["id"])
+
+    follow_up = registry.add(project, "DC-test", "def")
+    merged = registry.add(project, "DC-test", "ghi")
+
+    assert follow_up is not running
+    assert follow_up is merged
+    assert follow_up["commit"] == "ghi"
+    assert registry.pendingCount == 1
+    assert registry.runningCount == 1
+
+
+# it starts jobs by their priority and keeps formats apart
+def test_priority():
+    registry = JobRegistry()
+
+    pdf = registry.add(project, "DC-test", "abc", ["pdf"], 2)
+    html = registry.add(project, "DC-test", "abc", ["html"], 0)
+    other_html = registry.add(project, "DC-other", "abc", ["html"], 0)
+
+    assert registry.pendingCount == 3
+    assert registry.nextPending() is html
+
+    registry.start(html["id"])
+    assert registry.nextPending() is other_html
+
+    registry.start(other_html["id"])
+    assert registry.nextPending() is pdf
+    assert registry.add(project, "DC-test", "def", ["pdf"], 2) is pdf
@@ -0,0 +1,43 @@
+import os
+import pytest
+from dapsenv.logretention import prune_logs
+
+
+@pytest.fixture
+def log_dir(tmpdir):
+    # three logs with 100 bytes each, one, two and three days old
+    for days in (1, 2, 3):
+        path = tmpdir.join("build_fail_DC-test_html_{}.log.gz".format(days))
+        path.write("x" * 100)
+        os.utime(path.__str__(), (1000000 - days * 86400, 1000000 - days * 86400))
+
+    tmpdir.mkdir("running").join("1.log").write("x" * 1000)
+
+    # a log which is being written
+    path = tmpdir.join("build_fail_DC-test_pdf_4.log.gz.tmp")
+    path.write("x" * 100)
+    os.utime(path.__str__(), (1000000 - 5 * 86400, 1000000 - 5 * 86400))
+
+    return tmpdir
+
+
+def remaining(log_dir):
+    return sorted(path.basename for path in log_dir.listdir()
+                  if path.isfile() and path.basename.startswith("build_fail_DC-test_html"))
+
+
+# it removes logs which are too old and the oldest logs until the size limit is met
+@pytest.mark.parametrize("max_age,max_size,logs", [
+    (0, 0, [1, 2, 3]),
+    (int(2.5 * 86400), 0, [1, 2]),
+    (0, 250, [1, 2]),
+    (0, 100, [1]),
+    (int(1.5 * 86400), 250, [1])
+])
+def test_prune_logs(log_dir, max_age, max_size, logs):
+    prune_logs(log_dir.__str__(), max_age, max_size, now=1000000)
+
+    assert remaining(log_dir) == ["build_fail_DC-test_html_{}.log.gz".format(days)
+                                  for days in logs]
+    assert log_dir.join("running", "1.log").check()
+    assert log_dir.join("build_fail_DC-test_pdf_4.log.gz.tmp").check()
@@ -0,0 +1,116 @@
+import gzip
+import http.client
+import pytest
+import threading
+from dapsenv.logserver import LogServer, ThreadingHTTPServer
+
+
+@pytest.fixture
+def server(monkeypatch, tmpdir):
+    monkeypatch.setattr("dapsenv.logserver.LOG_DIR", tmpdir.__str__())
+    monkeypatch.setattr("dapsenv.joblog.LOG_DIR", tmpdir.__str__())
+    monkeypatch.setattr("dapsenv.joblog.RUNNING_LOG_DIR", tmpdir.mkdir("running").__str__())
+
+    tmpdir.join("build_fail_DC-test_html_1.log").write("0123456789")
+
+    with gzip.open(tmpdir.join("job_4.log.gz").__str__(), "wb") as f:
+        f.write(b"validate\nhtml\n")
+
+    with gzip.open(tmpdir.join("build_fail_DC-test_pdf_1.log.gz").__str__(), "wb") as f:
+        f.write(b"pdf log")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LogServer)
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, path, method="GET", headers=None):
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request(method, path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+
+    return response, body
+
+
+# it sends the whole log, a byte range or nothing if the range can't be satisfied
+@pytest.mark.parametrize("range_header,status,body", [
+    (None, 200, b"0123456789"),
+    ("bytes=2-4", 206, b"234"),
+    ("bytes=7-", 206, b"789"),
+    ("bytes=-2", 206, b"89"),
+    ("bytes=10-", 416, b"")
+])
+def test_range(server, range_header, status, body):
+    headers = {"Range": range_header} if range_header else {}
+    response, data = request(server, "/logs/build_fail_DC-test_html_1", headers=headers)
+
+    assert response.status == status
+    assert data == body
+
+
+# it compresses the log if the client accepts gzip
+def test_gzip(server, tmpdir):
+    response, data = request(server, "/logs/build_fail_DC-test_html_1",
+                             headers={"Accept-Encoding": "deflate, gzip"})
+
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(data) == b"0123456789"
+
+    response, data = request(server, "/logs/build_fail_DC-test_html_1",
+                             headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert response.getheader("Content-Encoding") is None
+    assert data == b"0123456789"
+
+
+# it sends logs which are stored compressed as they are or decompressed
+def test_compressed_log(server):
+    response, data = request(server, "/logs/build_fail_DC-test_pdf_1",
+                             headers={"Accept-Encoding": "gzip"})
+
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(data) == b"pdf log"
+
+    response, data = request(server, "/logs/build_fail_DC-test_pdf_1")
+
+    assert response.getheader("Content-Encoding") is None
+    assert data == b"pdf log"
+
+
+# it answers conditional requests for an unchanged log without a body
+def test_conditional(server):
+    response, data = request(server, "/logs/build_fail_DC-test_html_1", method="HEAD")
+    etag = response.getheader("ETag")
+
+    assert response.status == 200 and data == b""
+
+    response, data = request(server, "/logs/build_fail_DC-test_html_1",
+                             headers={"If-None-Match": etag})
+    assert response.status == 304 and data == b""
+
+    response, data = request(server, "/logs/build_fail_DC-test_html_1",
+                             headers={"If-Modified-Since": response.getheader("Last-Modified")})
+    assert response.status == 304
+
+    response, data = request(server, "/logs/build_fail_DC-test_html_1",
+                             headers={"If-None-Match": "\"other\""})
+    assert response.status == 200
+
+
+# it streams the log of a finished job from an offset and reports unknown logs
+def test_live_and_missing(server):
+    response, data = request(server, "/live/4?offset=9")
+
+    assert response.getheader("X-Log-Offset") == "9"
+    assert data == b"html\n"
+    assert request(server, "/live/5")[0].status == 404
+    assert request(server, "/logs/missing")[0].status == 404
@@ -0,0 +1,52 @@
+import os
+import pytest
+from __utils__ import commit, repo
+from dapsenv.exceptions import SnapshotExportException
+from dapsenv.snapshotstore import SnapshotStore
+
+
+@pytest.fixture
+def store(tmpdir):
+    return SnapshotStore(tmpdir.mkdir("snapshots").__str__())
+
+
+# it exports the tracked files of a commit only once
+def test_acquire(repo, store, tmpdir):
+    first = commit(repo, {"DC-test": "MAIN=test.xml", "xml/test.xml": "<book/>"}, "first")
+    repo.join("untracked").write("junk")
+
+    snapshot = store.acquire(repo.__str__(), first)
+    commit(repo, {"xml/test.xml": "<article/>"}, "second")
+
+    assert snapshot == tmpdir.join("snapshots", first, "repo").__str__()
+    assert sorted(os.listdir(snapshot)) == ["DC-test", "xml"]
+    assert store.acquire(repo.__str__(), first) == snapshot
+
+    with open(os.path.join(snapshot, "xml", "test.xml")) as f:
+        assert f.read() == "<book/>"
+
+
+# it removes only unused snapshots which should not be kept
+def test_prune(repo, store, tmpdir):
+    first = commit(repo, {"DC-test": "first"}, "first")
+    second = commit(repo, {"DC-test": "second"}, "second")
+    third = commit(repo, {"DC-test": "third"}, "third")
+
+    for rev in (first, second, third):
+        store.acquire(repo.__str__(), rev)
+
+    store.release(first)
+    store.release(second)
+    store.prune(keep=[second])
+
+    assert sorted(os.listdir(tmpdir.join("snapshots").__str__())) == sorted([second, third])
+
+
+# it fails for unknown commits and leaves no snapshot behind
+def test_acquire_invalid_commit(repo, store, tmpdir):
+    commit(repo, {"DC-test": "first"}, "first")
+
+    with pytest.raises(SnapshotExportException):
+        store.acquire(repo.__str__(), "0" * 40)
+
+    assert os.listdir(tmpdir.join("snapshots").__str__()) == []
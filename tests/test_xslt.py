@@ -0,0 +1,40 @@
+import dapsenv.xslt as xslt
+import os
+import pytest
+import threading
+from dapsenv.exceptions import InvalidRootIDException
+
+stylesheets = ["get-all-used-files.xsl", "guidename.xsl", "productname.xsl", "productnumber.xsl"]
+
+
+# it compiles a stylesheet only once per thread
+def test_get_transform():
+    for name in stylesheets:
+        assert xslt.getTransform(name) is xslt.getTransform(name)
+
+
+# it does not share compiled stylesheets between threads
+def test_get_transform_per_thread():
+    transforms = []
+
+    thread = threading.Thread(target=lambda: transforms.append(xslt.getTransform("guidename.xsl")))
+    thread.start()
+    thread.join()
+
+    assert transforms[0] is not xslt.getTransform("guidename.xsl")
+
+
+# it answers every root id of a MAIN file from one include graph
+def test_include_graph():
+    graph = xslt.IncludeGraph("{}/data/docbook/xml/MAIN.test.xml".format(
+        os.path.dirname(os.path.realpath(__file__))
+    ))
+
+    assert graph.getAllUsedFiles("book.a") == set(["cha_a1.xml", "img_a1.png"])
+    assert graph.getAllUsedFiles("book.b") == set(["cha_b1.xml", "img_b1.png"])
+
+    used_files, dependencies = graph.getUsedAndDependencyFiles("book.b")
+    assert dependencies == set(["MAIN.test.xml", "book_b.xml", "cha_b1.xml", "entity-decl.ent"])
+
+    with pytest.raises(InvalidRootIDException):
+        graph.getAllUsedFiles("book.missing")